@@ -0,0 +1,52 @@
+import os
+import tracemalloc
+
+import matplotlib
+
+matplotlib.use('Agg')
+
+import pytest
+
+from speck.draw import SpeckPlot
+
+IMAGE_PATH = os.path.join(
+    os.path.dirname(__file__), os.pardir, 'tests', 'resources', 'speck.jpg'
+)
+
+SIZES = [50, 150, 400]  # long edge of the resized input image
+UPSCALES = [5, 10]
+ROUNDS = 3
+
+
+@pytest.fixture(
+    scope='session',
+    params=[(size, upscale) for size in SIZES for upscale in UPSCALES],
+    ids=lambda p: 'size={}-upscale={}'.format(*p),
+)
+def speck_plot(request):
+    size, upscale = request.param
+    return SpeckPlot.from_path(IMAGE_PATH, upscale=upscale, resize=size)
+
+
+@pytest.fixture
+def measure(benchmark):
+    def measure(func, setup=lambda: None, rounds=ROUNDS):
+        """
+        Time func with setup run before every call, and record the peak memory allocated during one call
+        :param func: function to benchmark
+        :param setup: function run before every call, eg. to clear caches so that each call does the full work
+        :param rounds: number of timed calls
+        :return: return value of func
+        """
+
+        setup()
+        tracemalloc.start()
+        try:
+            func()
+            benchmark.extra_info['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return benchmark.pedantic(func, setup=setup, rounds=rounds)
+
+    return measure
@@ -0,0 +1,12 @@
+import subprocess
+import sys
+
+
+def test_import_time(benchmark):
+    # a fresh interpreter for every round, so nothing is already imported
+    benchmark.pedantic(
+        subprocess.run,
+        ([sys.executable, '-c', 'import speck'],),
+        {'check': True},
+        rounds=5,
+    )
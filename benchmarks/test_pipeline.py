@@ -0,0 +1,88 @@
+from io import BytesIO
+
+import matplotlib.pyplot as plt
+import pytest
+
+from speck.noise import SineNoise, RandomNoise
+from speck.colour import GradientColour, CmapColour, KMeansColour, GreyscaleMeanColour
+from speck.modifier import LineUnionModifier
+
+PARAMS = dict(weights=(0.2, 0.9), noise=SineNoise(), colour='black', seed=1)
+
+
+def clear(speck_plot, *parameters):
+    def setup():
+        for p in parameters:
+            speck_plot.cache_clear(p)
+
+    return setup
+
+
+def test_x(speck_plot, measure):
+    measure(speck_plot._x, clear(speck_plot, '_x'))
+
+
+def test_y(speck_plot, measure):
+    speck_plot._x()
+    measure(
+        lambda: speck_plot._y((0.2, 0.9), (0, 1), 0),
+        clear(speck_plot, '_y_array', '_y'),
+    )
+
+
+@pytest.mark.parametrize('profile', ['parallel', 'reflect', 'independent'])
+@pytest.mark.parametrize('noise_cls', [RandomNoise, SineNoise])
+def test_noise(speck_plot, measure, noise_cls, profile):
+    noise = noise_cls(profile)
+    measure(lambda: speck_plot._noise(noise, 1), clear(speck_plot, '_noise'))
+
+
+@pytest.mark.parametrize(
+    'colour',
+    [
+        lambda s: GradientColour(['red', 'green', 'blue']),
+        lambda s: CmapColour(plt.get_cmap('viridis')),
+        lambda s: KMeansColour(s),
+        lambda s: KMeansColour(s, fast=True),
+        lambda s: GreyscaleMeanColour(s),
+    ],
+    ids=['gradient', 'cmap', 'kmeans', 'kmeans_fast', 'greyscale_mean'],
+)
+def test_colour(speck_plot, measure, colour):
+    measure(lambda: colour(speck_plot)(speck_plot.h))
+
+
+def test_line_union_modifier(speck_plot, measure):
+    x, y = speck_plot._x(), speck_plot._y((0.2, 0.9), (0, 1), 0)
+    n = speck_plot._noise(PARAMS['noise'], PARAMS['seed'])
+    thicknesses = [1, 2, 3] * (speck_plot.h // 6) + [1] * (speck_plot.h % 6)
+    modifier = LineUnionModifier(thicknesses)
+    measure(lambda: modifier(x, y, n, ['black']))
+
+
+def redraw(speck_plot):
+    def setup():
+        # the caches and the memoized last draw, so that nothing is reused from the previous round
+        speck_plot.cache_clear()
+        speck_plot._collection_key = None
+        speck_plot._raster_key = None
+
+    return setup
+
+
+@pytest.mark.parametrize('backend', ['matplotlib', 'raster'])
+def test_draw(speck_plot, measure, backend):
+    setup = redraw(speck_plot)
+    measure(lambda: speck_plot.draw(backend=backend, **PARAMS), setup)
+
+    # every round renders the lines
+    setup()
+    speck_plot.draw(backend=backend, profile=True, **PARAMS)
+    names = [stage.name for stage in speck_plot.last_profile.stages]
+    assert ('polygons' if backend == 'matplotlib' else 'rasterize') in names
+
+
+@pytest.mark.parametrize('backend', ['matplotlib', 'raster'])
+def test_save(speck_plot, measure, backend):
+    speck_plot.draw(backend=backend, **PARAMS)
+    measure(lambda: speck_plot.save(BytesIO()))
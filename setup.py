@@ -14,6 +14,7 @@ setup(
         'requests',
         'pytest',
         'pytest-mpl',
+        'pytest-benchmark',
     ],
     include_package_data=True,
 )
@@ -1,12 +1,25 @@
 from .draw import SpeckPlot
 from .noise import *
 from .colour import *
-from .tools import SpeckWidget
-from .modifier import LineUnionModifier
+from .modifier import (
+    LineUnionModifier,
+    AdaptiveSampleModifier,
+    LineModifier,
+    ModifierPipeline,
+)
 
-from pkg_resources import get_distribution, DistributionNotFound
+from importlib.metadata import version, PackageNotFoundError
 
 try:
-    __version__ = get_distribution('speck').version
-except DistributionNotFound:
+    __version__ = version('speck')
+except PackageNotFoundError:
     pass
+
+
+def __getattr__(name):
+    # ipywidgets is slow to import and not needed outside of notebooks, so SpeckWidget is imported on first use
+    if name == 'SpeckWidget':
+        from .tools import SpeckWidget
+
+        return SpeckWidget
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
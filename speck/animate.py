@@ -0,0 +1,139 @@
+__all__ = ['FrameWriter', 'ImageSequenceWriter', 'FFmpegWriter']
+
+from typing import Any, Dict, Iterable, Optional
+from abc import ABC, abstractmethod
+import subprocess
+
+from numpy.typing import DTypeLike
+from PIL import Image
+
+from speck.store import DiskCache
+
+
+class FrameWriter(ABC):
+    """
+    Destination for the frames rendered by SpeckPlot.animate, written one at a time in order.
+    Create your own by implementing write, and close if the output needs finalising.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @abstractmethod
+    def write(self, image: Image.Image) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ImageSequenceWriter(FrameWriter):
+    def __init__(self, pattern: str, **kwargs):
+        """
+        Save each frame to its own image file
+        :param pattern: format string of frame paths that is formatted with the frame number, eg. 'frames/{:04d}.png'
+        :param kwargs: options passed to PIL Image.save, eg. compress_level=1 for faster png frames
+        """
+
+        self.pattern = pattern
+        self.kwargs = kwargs
+        self.frames = 0
+
+    def write(self, image: Image.Image) -> None:
+        image.save(self.pattern.format(self.frames), **self.kwargs)
+        self.frames += 1
+
+
+class FFmpegWriter(FrameWriter):
+    def __init__(
+        self,
+        path: str,
+        fps: float = 30,
+        args: Iterable[str] = (
+            '-vf',
+            'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+            '-pix_fmt',
+            'yuv420p',
+        ),
+        ffmpeg: str = 'ffmpeg',
+    ):
+        """
+        Encode frames to a video by piping them to an ffmpeg process as they are rendered
+        :param path: output video path, the container and default codec are chosen by ffmpeg from the extension
+        :param fps: frames per second
+        :param args: output arguments passed to ffmpeg before path, by default pads to even dimensions for yuv420p
+        :param ffmpeg: ffmpeg executable
+        """
+
+        self.path = path
+        self.fps = fps
+        self.args = list(args)
+        self.ffmpeg = ffmpeg
+        self._process = None
+
+    def write(self, image: Image.Image) -> None:
+        if self._process is None:
+            # the frame size is only known once the first frame is rendered
+            w, h = image.size
+            self._process = subprocess.Popen(
+                [
+                    self.ffmpeg,
+                    '-y',
+                    '-loglevel',
+                    'error',
+                    '-f',
+                    'rawvideo',
+                    '-pix_fmt',
+                    'rgba',
+                    '-s',
+                    f'{w}x{h}',
+                    '-r',
+                    str(self.fps),
+                    '-i',
+                    '-',
+                    *self.args,
+                    self.path,
+                ],
+                stdin=subprocess.PIPE,
+            )
+        self._process.stdin.write(image.convert('RGBA').tobytes())
+
+    def close(self) -> None:
+        if self._process is None:
+            return
+
+        self._process.stdin.close()
+        if self._process.wait():
+            raise RuntimeError(f'ffmpeg exited with code {self._process.returncode}')
+        self._process = None
+
+
+_speck_plot = None  # worker-local SpeckPlot that renders every frame sent to the worker
+
+
+def _init_worker(
+    image: Image.Image,
+    upscale: int,
+    horizontal: bool,
+    dtype: DTypeLike,
+    k: int,
+    scratch: Optional[str],
+    disk_cache: Optional[DiskCache],
+) -> None:
+    from speck.draw import SpeckPlot
+
+    global _speck_plot
+    _speck_plot = SpeckPlot(image, upscale, horizontal, dtype)
+    _speck_plot.set_k(k)
+    if scratch is not None:
+        # workers share the geometry and noise files instead of each generating their own
+        _speck_plot.set_scratch_dir(scratch)
+    if disk_cache is not None:
+        _speck_plot.set_disk_cache(disk_cache.directory, disk_cache.max_bytes)
+
+
+def _render_frame(params: Dict[str, Any]) -> Image.Image:
+    return _speck_plot.draw(backend='raster', **params)
@@ -0,0 +1,97 @@
+__all__ = ['Job', 'Result', 'render_many']
+
+from typing import Union, Iterable, Iterator, Optional, Tuple, Dict, Any, NamedTuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from io import BytesIO
+import time
+import traceback
+
+from speck.draw import SpeckPlot
+
+
+class Job(NamedTuple):
+    """
+    A single render: an input image, SpeckPlot.draw parameters and where to save the output
+    :param path: path to input image file
+    :param params: keyword arguments passed to SpeckPlot.draw
+    :param output: path to save the output to, or None to return the saved PNG as bytes
+    :param upscale: the pixel scaling factor, each input pixel maps to upscale output pixels
+    :param resize: dimensions to resize to or a single value to set the long edge to and keep the input aspect ratio
+    :param horizontal: use horizontal lines to render the image
+    :param transparent: whether to save with a transparent background
+    """
+
+    path: str
+    params: Dict[str, Any] = {}
+    output: Optional[str] = None
+    upscale: int = 10
+    resize: Optional[Union[int, Tuple[int, int]]] = None
+    horizontal: bool = True
+    transparent: bool = False
+
+
+class Result(NamedTuple):
+    """
+    Outcome of a Job
+    :param index: position of the job in the jobs passed to render_many
+    :param job: the job that was rendered
+    :param output: output path or PNG bytes, None if the job failed
+    :param time: seconds spent rendering and saving the job
+    :param error: formatted traceback if the job raised an exception, otherwise None
+    """
+
+    index: int
+    job: Job
+    output: Optional[Union[str, bytes]]
+    time: float
+    error: Optional[str] = None
+
+
+@lru_cache(maxsize=8)
+def _speck_plot(
+    path: str,
+    upscale: int,
+    resize: Optional[Union[int, Tuple[int, int]]],
+    horizontal: bool,
+) -> SpeckPlot:
+    # worker-local SpeckPlot per image, reused (along with its geometry caches) across parameter sets
+    return SpeckPlot.from_path(path, upscale, resize, horizontal)
+
+
+def _render(index: int, job: Job) -> Result:
+    start = time.perf_counter()
+    try:
+        resize = tuple(job.resize) if isinstance(job.resize, list) else job.resize
+        s = _speck_plot(job.path, job.upscale, resize, job.horizontal)
+        s.draw(**job.params)
+
+        if job.output is None:
+            buffer = BytesIO()
+            s.save(buffer, job.transparent)
+            output = buffer.getvalue()
+        else:
+            s.save(job.output, job.transparent)
+            output = job.output
+    except Exception:
+        return Result(
+            index, job, None, time.perf_counter() - start, traceback.format_exc()
+        )
+
+    return Result(index, job, output, time.perf_counter() - start)
+
+
+def render_many(jobs: Iterable[Job], workers: Optional[int] = None) -> Iterator[Result]:
+    """
+    Render many jobs in parallel over a pool of worker processes.
+    Results are yielded as each job finishes, so not necessarily in the order of jobs.
+    Exceptions raised by a job are captured in its Result rather than raised.
+    :param jobs: Job objects to render
+    :param workers: number of worker processes, defaults to the number of processors
+    :return: iterator of Result objects
+    """
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_render, i, job) for i, job in enumerate(jobs)]
+        for future in as_completed(futures):
+            yield future.result()
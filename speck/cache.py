@@ -0,0 +1,196 @@
+__all__ = ['CacheInfo', 'ByteCache', 'cached', 'cache_slot']
+
+from typing import Any, Callable, Hashable, Optional, Dict, Tuple
+from collections import OrderedDict, namedtuple
+from functools import update_wrapper
+import threading
+
+import numpy as np
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize', 'nbytes'])
+
+_MISSING = object()
+
+
+def buffers(value: Any) -> Dict[int, np.ndarray]:
+    """
+    Find the distinct numpy buffers referenced by a cached value, keyed by id.
+    Views (eg. per line views over a batched array) resolve to their base array.
+    Memory-mapped arrays are paged in from disk as needed, so they aren't counted.
+    """
+
+    bases = {}
+
+    def visit(v):
+        if isinstance(v, np.memmap):
+            return
+        elif isinstance(v, np.ndarray):
+            while isinstance(v.base, np.ndarray):
+                v = v.base
+            bases[id(v)] = v
+        elif isinstance(v, (list, tuple)):
+            for i in v:
+                visit(i)
+
+    visit(value)
+    return bases
+
+
+def _size(bases: Dict[int, np.ndarray]) -> int:
+    return sum(b.nbytes for b in bases.values())
+
+
+class ByteCache:
+    def __init__(self, max_bytes: int):
+        """
+        Least recently used cache bounded by the total size in bytes of the values it holds
+        :param max_bytes: byte budget, least recently used entries are evicted to stay under it
+        """
+
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # (name, key) -> (value, buffers)
+        self._buffers = {}  # id -> [buffer, number of entries referencing it]
+        self._stats = {}  # name -> [hits, misses]
+        self._lock = threading.RLock()
+
+    def get(self, name: str, key: Hashable) -> Any:
+        with self._lock:
+            stats = self._stats.setdefault(name, [0, 0])
+            try:
+                value, _ = self._entries[name, key]
+            except KeyError:
+                stats[1] += 1
+                return _MISSING
+
+            stats[0] += 1
+            self._entries.move_to_end((name, key))
+            return value
+
+    def put(self, name: str, key: Hashable, value: Any) -> None:
+        bases = buffers(value)
+        with self._lock:
+            if (name, key) in self._entries or _size(bases) > self.max_bytes:
+                # values larger than the whole budget are returned but never cached
+                return
+
+            self._entries[name, key] = value, bases
+            for i, b in bases.items():
+                # buffers shared with other entries are only counted once
+                if i in self._buffers:
+                    self._buffers[i][1] += 1
+                else:
+                    self._buffers[i] = [b, 1]
+                    self.nbytes += b.nbytes
+            self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            while self.nbytes > self.max_bytes:
+                self._pop(next(iter(self._entries)))
+
+    def _pop(self, k: Tuple[str, Hashable]) -> None:
+        _, bases = self._entries.pop(k)
+        for i in bases:
+            self._buffers[i][1] -= 1
+            if not self._buffers[i][1]:
+                self.nbytes -= self._buffers.pop(i)[0].nbytes
+
+    def clear(self, name: Optional[str] = None) -> None:
+        with self._lock:
+            for k in [k for k in self._entries if name is None or k[0] == name]:
+                self._pop(k)
+            for k in [k for k in self._stats if name is None or k == name]:
+                del self._stats[k]
+
+    def info(self, name: str) -> CacheInfo:
+        with self._lock:
+            hits, misses = self._stats.get(name, (0, 0))
+            sizes = [_size(b) for k, (_, b) in self._entries.items() if k[0] == name]
+            return CacheInfo(hits, misses, self.max_bytes, len(sizes), sum(sizes))
+
+
+class cached:
+    def __init__(self, func: Callable):
+        """
+        Method decorator that caches results in the instance's ByteCache (stored as instance._cache).
+        Like functools.lru_cache, the bound method has cache_info and cache_clear methods,
+        but the cache belongs to the instance and is bounded by size in bytes rather than number of entries.
+        """
+
+        self.func = func
+        update_wrapper(self, func)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return _BoundCached(self.func, instance)
+
+
+class cache_slot:
+    def __init__(self):
+        """
+        Named part of the instance's ByteCache for values the caller computes and stores itself, with get and put
+        in place of a cached method, and the same cache_info and cache_clear methods
+        """
+
+        self.__name__ = None
+
+    def __set_name__(self, owner, name):
+        self.__name__ = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return _BoundSlot(self.__name__, instance)
+
+
+class _BoundSlot:
+    def __init__(self, name: str, instance):
+        self.__name__ = name
+        self.instance = instance
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            hash(key)
+        except TypeError:
+            # values with unhashable keys are never cached
+            return default
+
+        value = self.instance._cache.get(self.__name__, key)
+        return default if value is _MISSING else value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        try:
+            hash(key)
+        except TypeError:
+            return
+        self.instance._cache.put(self.__name__, key, value)
+
+    def cache_info(self) -> CacheInfo:
+        return self.instance._cache.info(self.__name__)
+
+    def cache_clear(self) -> None:
+        self.instance._cache.clear(self.__name__)
+
+
+class _BoundCached(_BoundSlot):
+    def __init__(self, func: Callable, instance):
+        super().__init__(func.__name__, instance)
+        self.func = func
+        update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        key = args + tuple(sorted(kwargs.items()))
+        try:
+            hash(key)
+        except TypeError:
+            # calls with unhashable arguments are never cached
+            return self.func(self.instance, *args, **kwargs)
+
+        value = self.instance._cache.get(self.__name__, key)
+        if value is _MISSING:
+            value = self.func(self.instance, *args, **kwargs)
+            self.instance._cache.put(self.__name__, key, value)
+
+        return value
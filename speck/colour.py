@@ -1,14 +1,21 @@
 __all__ = ['GradientColour', 'CmapColour', 'KMeansColour', 'GreyscaleMeanColour']
 
-from typing import Union, Iterable, Tuple, List
+from typing import Union, Tuple, List, Optional
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+import os
 
-import cv2
 import numpy as np
 import matplotlib as mpl
 
+from speck.store import digest
+from speck.types import ColourData
+
 
 class Colour(ABC):
+    # whether __call__ also takes skip, the number of rows skipped for each drawn line
+    supports_skip = False
+
     def __repr__(self):
         """
         Auto __repr__ based on instance __dict__
@@ -22,7 +29,14 @@ class Colour(ABC):
         h = []
         for k, v in self.__dict__.items():
             if not k.startswith('_'):
-                h.append(tuple(v) if isinstance(v, list) else v)
+                if isinstance(v, list):
+                    v = tuple(v)
+                elif isinstance(v, np.ndarray):
+                    v = v.shape, v.tobytes()
+                elif isinstance(v, mpl.colors.Colormap):
+                    # colormaps aren't hashable, so their colour table is hashed instead
+                    v = v(np.arange(v.N)).tobytes()
+                h.append(v)
 
         return hash(tuple(h))
 
@@ -30,7 +44,10 @@ class Colour(ABC):
         return hash(self) == hash(other)
 
     @abstractmethod
-    def __call__(self, m: int) -> Iterable[Tuple[float, ...]]:
+    def __call__(self, m: int) -> ColourData:
+        # m = number of rows
+        # returns an (m, 4) RGBA array, or any iterable of matplotlib colours
+        # subclasses with supports_skip = True are called as __call__(m, skip) instead
         pass
 
 
@@ -47,8 +64,8 @@ class GradientColour(Colour):
         self.colour_list = colour_list
         self._cmap = mpl.colors.LinearSegmentedColormap.from_list("", colour_list)
 
-    def __call__(self, m: int) -> Iterable[Tuple[float, ...]]:
-        return [self._cmap(x) for x in np.linspace(0, 1, m, endpoint=False)]
+    def __call__(self, m: int) -> np.ndarray:
+        return self._cmap(np.linspace(0, 1, m, endpoint=False))
 
 
 class CmapColour(Colour):
@@ -61,31 +78,57 @@ class CmapColour(Colour):
 
         self.cmap = mpl.cm.get_cmap(cmap) if isinstance(cmap, str) else cmap
 
-    def __call__(self, m: int) -> Iterable[Tuple[float, ...]]:
-        return [self.cmap(x) for x in np.linspace(0, 1, m, endpoint=False)]
+    def __call__(self, m: int) -> np.ndarray:
+        return self.cmap(np.linspace(0, 1, m, endpoint=False))
 
 
 class KMeansColour(Colour):
-    criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 200, 0.1)
-    flags = cv2.KMEANS_RANDOM_CENTERS
-
-    def __init__(self, speck_plot, k: int = 5):
+    supports_skip = True
+
+    def __init__(
+        self,
+        speck_plot,
+        k: int = 5,
+        fast: bool = False,
+        samples: int = 128,
+        workers: Optional[int] = None,
+    ):
         """
         Create KMeansColour object to be passed to SpeckPlot.draw method.
         Clusters each horizontal line of pixel colour values into k groups using k-means to determine
         the dominant colour of that row, and then sets the line colour to that.
         :param speck_plot: SpeckPlot object to base colours on
         :param k: number of groups for k-means
+        :param fast: cluster a subsample of each row, starting from the previous row's groups, over a pool of threads
+        :param samples: maximum number of pixels clustered per row when fast
+        :param workers: number of threads used when fast, defaults to the number of processors
         """
 
+        # cv2 is slow to import, so it is only imported once a KMeansColour is created
+        import cv2
+
+        self.criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 200, 0.1)
+        self.flags = cv2.KMEANS_RANDOM_CENTERS
+
         if speck_plot.image.mode not in ('RGB', 'RGBA'):
             raise AssertionError('KMeansColour requires RGB image mode')
         else:
-            self.im = np.array(speck_plot.image.convert('RGB'))
+            self._im = _frozen(np.array(speck_plot.image.convert('RGB')))
+            # hashed instead of the pixels, so cache lookups don't hash the whole image every time
+            self.image_digest = digest(self._im)
 
         self.k = k
+        self.fast = fast
+        self.samples = samples
+        self.workers = workers
+
+    @property
+    def im(self) -> np.ndarray:
+        return self._im
 
     def _kmeans_colour(self, row: np.ndarray) -> Tuple:
+        import cv2
+
         _, labels, palette = cv2.kmeans(
             row, self.k, None, self.criteria, 10, self.flags
         )
@@ -93,18 +136,76 @@ class KMeansColour(Colour):
 
         return palette[np.argmax(counts)] / 255
 
-    def __call__(self, m: int) -> Iterable[Tuple[float, ...]]:
-        return list(
-            map(
-                tuple,
-                np.squeeze(
-                    np.apply_along_axis(self._kmeans_colour, 1, np.float32(self.im))
-                ),
+    def _kmeans_warm_start(
+        self, row: np.ndarray, centres: Optional[np.ndarray]
+    ) -> Tuple[float, np.ndarray]:
+        import cv2
+
+        if centres is None:
+            _, labels, centres = cv2.kmeans(
+                row, self.k, None, self.criteria, 10, self.flags
             )
-        )
+        else:
+            # label each value with the nearest of the previous row's centres and run a single attempt from there
+            labels = np.int32(np.argmin(np.abs(row[:, None] - centres.T), axis=1))
+            _, labels, centres = cv2.kmeans(
+                row,
+                self.k,
+                labels[:, None],
+                self.criteria,
+                1,
+                cv2.KMEANS_USE_INITIAL_LABELS,
+            )
+        counts = np.bincount(labels.ravel(), minlength=self.k)
+
+        return centres[np.argmax(counts), 0] / 255, centres
+
+    def _kmeans_rows(self, rows: np.ndarray) -> List[float]:
+        colours, centres = [], None
+        for row in rows:
+            colour, centres = self._kmeans_warm_start(row, centres)
+            colours.append(colour)
+
+        return colours
+
+    def __call__(self, m: int, skip: int = 0) -> np.ndarray:
+        # only the rows that are drawn as lines are clustered
+        im = np.float32(self.im[:: skip + 1])
+
+        if not self.fast:
+            colours = np.squeeze(
+                np.apply_along_axis(self._kmeans_colour, 1, im), axis=1
+            )
+            return mpl.colors.to_rgba_array(colours.clip(0, 1))
+
+        # like above, each colour channel of each row is clustered separately.
+        # rows are split into chunks that are clustered in parallel (cv2 releases the GIL),
+        # with each row warm started from the previous row in its chunk
+        step = max(1, im.shape[1] // max(self.samples, self.k))
+        channels = im[:, ::step].transpose(2, 0, 1)
+        workers = self.workers or os.cpu_count() or 1
+        chunks = [
+            (c, rows)
+            for c in range(channels.shape[0])
+            for rows in np.array_split(np.arange(len(im)), workers)
+            if len(rows)
+        ]
+
+        def cluster(chunk):
+            c, rows = chunk
+            return self._kmeans_rows(channels[c, rows])
+
+        colours = np.empty((len(im), channels.shape[0]))
+        with ThreadPoolExecutor(workers) as executor:
+            for (c, rows), chunk_colours in zip(chunks, executor.map(cluster, chunks)):
+                colours[rows, c] = chunk_colours
+
+        return mpl.colors.to_rgba_array(colours.clip(0, 1))
 
 
 class GreyscaleMeanColour(Colour):
+    supports_skip = True
+
     def __init__(self, speck_plot):
         """
         Create GreyScacleMeanColour objrect to be passed to SpeckPlot.draw method.
@@ -112,7 +213,33 @@ class GreyscaleMeanColour(Colour):
         :param speck_plot: SpeckPlot object to base colours on
         """
 
-        self.im = speck_plot.im
+        self._im = _frozen(speck_plot.im.copy())
+        # hashed instead of the pixels, so cache lookups don't hash the whole image every time
+        self.image_digest = digest(self._im)
+
+    @property
+    def im(self) -> np.ndarray:
+        return self._im
+
+    def __call__(self, m: int, skip: int = 0) -> np.ndarray:
+        return mpl.colors.to_rgba_array(
+            np.repeat(np.array(self.im)[:: skip + 1].mean(1, keepdims=True), 3, 1)
+            / 255.0
+        )
+
+
+def _frozen(a: np.ndarray) -> np.ndarray:
+    # read only, so the digest taken of it stays valid
+    a.flags.writeable = False
+    return a
+
+
+def rgba_array(c: ColourData, m: int) -> np.ndarray:
+    """
+    Convert colours to an (m, 4) RGBA array, cycling through them if there are fewer than m
+    :param c: (n, 3) or (n, 4) array or iterable of matplotlib colours
+    :param m: number of colours to return
+    """
 
-    def __call__(self, m: int) -> Iterable[Tuple[float, ...]]:
-        return [(c, c, c) for c in np.array(self.im).mean(1) / 255.0]
+    rgba = mpl.colors.to_rgba_array(c if isinstance(c, np.ndarray) else list(c))
+    return rgba[np.arange(m) % len(rgba)]
@@ -1,38 +1,54 @@
 __all__ = ['SpeckPlot']
 
-from typing import Union, Iterable, Optional, Tuple, Dict
+from typing import Union, Iterable, Iterator, Optional, Tuple, Dict, List, BinaryIO, Any
+from concurrent.futures import ProcessPoolExecutor
 from itertools import cycle
-from functools import lru_cache
 import logging
 
 import numpy as np
-import matplotlib.pyplot as plt
-from matplotlib import figure
+from numpy.typing import DTypeLike
+from matplotlib.figure import Figure
 from matplotlib.axis import Axis
+from matplotlib.collections import PolyCollection
 from PIL import Image
 
 from speck.noise import Noise
-from speck.colour import Colour
-from speck.modifier import Modifier
-from speck.types import XData, YData, NoiseData, ColourData
+from speck.colour import Colour, rgba_array
+from speck.modifier import Modifier, ModifierPipeline
+from speck.raster import rasterize, to_image, to_rgba8, PNGWriter
+from speck.vector import outlines, write_svg, write_pdf
+from speck.store import MemmapStore, DiskCache, digest
+from speck.cache import ByteCache, CacheInfo, cached, cache_slot
+from speck.profile import Profile
+from speck.animate import FrameWriter, ImageSequenceWriter, _init_worker, _render_frame
+from speck.types import XData, LineXData, YData, YArray, NoiseData, ColourData
 
 logger = logging.getLogger('speck')
 
 
 class SpeckPlot:
     dpi = 100  # figure dpi used for plotting and saving
+    max_cache_bytes = 2**30  # byte budget of each instance's x, y and noise cache
 
-    def __init__(self, image: Image, upscale: int = 10, horizontal: bool = True):
+    def __init__(
+        self,
+        image: Image,
+        upscale: int = 10,
+        horizontal: bool = True,
+        dtype: DTypeLike = np.float64,
+    ):
         """
         Create a SpeckPlot from a PIL Image
         :param image: PIL image
         :param upscale: the pixel scaling factor, each input pixel maps to upscale output pixels
         :param horizontal: use horizontal lines to render the image
+        :param dtype: float dtype of the line geometry and noise, eg. np.float32 to halve memory use
         """
 
         self.image = image
         self.scale = upscale
         self.horizontal = horizontal
+        self.dtype = np.dtype(dtype)
         if self.horizontal:
             self.im = np.array(image.convert('L'))
         else:
@@ -40,9 +56,26 @@ class SpeckPlot:
 
         self.h, self.w = self.im.shape
         figsize = self.w * upscale / self.dpi, self.h * upscale / self.dpi
-        self.fig = plt.figure(figsize=figsize if self.horizontal else figsize[::-1])
+        # not created through pyplot, so no gui backend is selected and the figure is not held open by pyplot
+        self.fig = Figure(figsize=figsize if self.horizontal else figsize[::-1])
         self.ax = self.fig.add_axes([0.0, 0.0, 1.0, 1.0], xticks=[], yticks=[])
-        plt.close(self.fig)
+        self._raster = (
+            None  # (layer, background, image) of the last raster backend draw
+        )
+        self._raster_key = (
+            None  # parameters the last raster backend draw was rendered with
+        )
+        self._cache = ByteCache(self.max_cache_bytes)
+        self._store = (
+            None  # MemmapStore that backs the geometry and noise caches, if any
+        )
+        self._disk_cache = None  # persistent DiskCache of geometry and noise, if any
+        self._collection = None  # line polygons of the last matplotlib backend draw
+        self._collection_key = None  # geometry parameters the polygons were drawn with
+        self._lines = None  # (x, y, noise, facecolors, background) of the last draw, for vector output
+        self.last_profile = (
+            None  # Profile of the last draw or save called with profile=True
+        )
 
         self.k = 10  # logistic growth rate on pixel boundaries
         self.inter = int(upscale) if upscale >= 10 else 10
@@ -59,6 +92,7 @@ class SpeckPlot:
         upscale: int = 10,
         resize: Optional[Union[int, Tuple[int, int]]] = None,
         horizontal: bool = True,
+        dtype: DTypeLike = np.float64,
     ):
         """
         Create a SpeckPlot from an image path
@@ -66,10 +100,11 @@ class SpeckPlot:
         :param upscale: the pixel scaling factor, each input pixel maps to upscale output pixels
         :param resize: dimensions to resize to or a single value to set the long edge to and keep the input aspect ratio
         :param horizontal: use horizontal lines to render the image
+        :param dtype: float dtype of the line geometry and noise, eg. np.float32 to halve memory use
         """
 
         image = Image.open(path)
-        return cls(cls._resize_image(image, resize), upscale, horizontal)
+        return cls(cls._resize_image(image, resize), upscale, horizontal, dtype)
 
     @classmethod
     def from_url(
@@ -78,6 +113,7 @@ class SpeckPlot:
         upscale: int = 10,
         resize: Optional[Union[int, Tuple[int, int]]] = None,
         horizontal: bool = True,
+        dtype: DTypeLike = np.float64,
     ):
         """
         Create SpeckPlot from image URL
@@ -85,13 +121,14 @@ class SpeckPlot:
         :param upscale: the pixel scaling factor, each input pixel maps to upscale output pixels
         :param resize: dimensions to resize to or a single value to set the long edge to and keep the input aspect ratio
         :param horizontal: use horizontal lines to render the image
+        :param dtype: float dtype of the line geometry and noise, eg. np.float32 to halve memory use
         """
 
         import requests
         from io import BytesIO
 
         image = Image.open(BytesIO(requests.get(url).content))
-        return cls(cls._resize_image(image, resize), upscale, horizontal)
+        return cls(cls._resize_image(image, resize), upscale, horizontal, dtype)
 
     @staticmethod
     def _resize_image(
@@ -130,94 +167,202 @@ class SpeckPlot:
             getattr(self, parameter).cache_clear()
         else:
             self._x.cache_clear()
+            self._kernel.cache_clear()
+            self._y_array.cache_clear()
             self._y.cache_clear()
             self._noise.cache_clear()
+            self._colour.cache_clear()
+            self._modified.cache_clear()
 
-    def cache_info(self) -> Dict[str, Tuple[int, ...]]:
-        return {
+    def cache_info(self) -> Dict[str, CacheInfo]:
+        info = {
             'x': self._x.cache_info(),
+            'kernel': self._kernel.cache_info(),
+            'y_array': self._y_array.cache_info(),
             'y': self._y.cache_info(),
             'noise': self._noise.cache_info(),
+            'colour': self._colour.cache_info(),
+            'modified': self._modified.cache_info(),
         }
+        if self._disk_cache is not None:
+            info['disk'] = self._disk_cache.info()
+        return info
+
+    def set_max_cache_bytes(self, max_bytes: int) -> None:
+        self._cache.max_bytes = max_bytes
+        self._cache.evict()
+
+    def set_scratch_dir(self, directory: Optional[str]) -> None:
+        """
+        Store line geometry and noise in memory-mapped files in directory instead of in memory, for images whose
+        geometry doesn't fit in RAM. Rows are generated into the files a band at a time and the backends read
+        straight from them. Files are named by a hash of the image and parameters, so processes sharing the
+        directory reuse each other's files. Noise is only stored when a seed is given.
+        :param directory: scratch directory, or None to go back to in memory storage
+        """
+
+        self._store = None if directory is None else MemmapStore(directory)
+        for f in (self._y_array, self._y, self._noise, self._modified):
+            f.cache_clear()
+
+    def set_disk_cache(self, directory: Optional[str], max_bytes: int = 2**32) -> None:
+        """
+        Persist line geometry and noise as compressed files in directory, so that new processes drawing the same
+        image with the same parameters load them rather than generating them again. Files are named by a hash of
+        the image and parameters. Least recently used files are deleted to keep the directory under max_bytes.
+        Noise is only stored when a seed is given. A scratch directory, if set, is used instead.
+        :param directory: cache directory, or None to stop using a disk cache
+        :param max_bytes: disk budget in bytes (4 GiB by default)
+        """
+
+        self._disk_cache = (
+            None if directory is None else DiskCache(directory, max_bytes)
+        )
 
     def set_k(self, k: int) -> None:
         self.k = k
-        self.cache_clear()
+        # x, noise and colour don't depend on k, so only the line shapes are recomputed
+        for f in (self._kernel, self._y_array, self._y, self._modified):
+            f.cache_clear()
 
-    @lru_cache()
+    @cached
     def _x(self) -> XData:
-        return np.linspace(0, self.w, self.w * self.inter)
+        return np.linspace(0, self.w, self.w * self.inter, dtype=self.dtype)
 
-    @lru_cache()
-    def _y(
+    @cached
+    def _kernel(self) -> np.ndarray:
+        # sigmoid transition across each pixel boundary, which is the same for every line
+        x0 = np.repeat(np.arange(1, self.w, dtype=self.dtype), self.inter)
+        x0 = np.pad(x0, (self.inter // 2, self.inter - self.inter // 2), mode='edge')
+        return 1 / (1 + np.exp(-self.k * (self._x() - x0)))
+
+    @cached
+    def _y_array(
         self,
         weights: Tuple[float, float],
         weight_clipping: Tuple[float, float],
         skip: int,
-    ) -> YData:
+    ) -> YArray:
+        rows = np.arange(0, self.h, skip + 1)
+        if self._store is None and self._disk_cache is None:
+            return self._y_rows(rows, weights, weight_clipping)
+
+        key = digest(
+            'y',
+            self.im,
+            self.inter,
+            self.k,
+            self.dtype.str,
+            weights,
+            weight_clipping,
+            skip,
+        )
+        if self._store is None:
+            return self._disk_cache.get(
+                key, lambda: self._y_rows(rows, weights, weight_clipping)
+            )
+        return self._store.array(
+            key,
+            (2, len(rows), self.w * self.inter),
+            self.dtype,
+            lambda lines: self._y_rows(rows[lines], weights, weight_clipping),
+        )
+
+    def _y_rows(
+        self,
+        rows: np.ndarray,
+        weights: Tuple[float, float],
+        weight_clipping: Tuple[float, float],
+    ) -> YArray:
+        # (y_top, y_bot) of the lines drawn for the given rows of pixels
         y_min = weights[0] / 2 + 0.5
         y_max = weights[1] / 2 + 0.5
         clip_min = (1 - weight_clipping[1]) * 255.0
         clip_max = (1 - weight_clipping[0]) * 255.0
 
         def repeat_head_tail(arr: np.ndarray, n: int) -> np.ndarray:
-            repeated = np.insert(
-                np.insert(arr, 0, np.ones(n // 2) * arr[0]),
-                -1,
-                np.ones(n // 2) * arr[-1],
-            )
-
-            if n % 2:
-                # odd, so append the last point again
-                repeated = np.append(repeated, repeated[-1])
-
-            return repeated
-
-        y = []
-        for i, line in enumerate(self.im):
-            if i % (skip + 1):
-                continue
-
-            # apply clipping
-            line = (
-                (line.clip(clip_min, clip_max) - clip_min) * 255 / (clip_max - clip_min)
+            # pad the last axis with n // 2 copies of the head and the rest with the tail
+            return np.pad(
+                arr, [(0, 0)] * (arr.ndim - 1) + [(n // 2, n - n // 2)], mode='edge'
             )
 
-            y_offset = np.repeat(y_max - line[:-1] * (y_max - y_min) / 255, self.inter)
-            L = (
-                np.repeat(y_max - line[1:] * (y_max - y_min) / 255, self.inter)
-                - y_offset
-            )
-
-            x0 = np.repeat(np.arange(1, self.w), self.inter)
+        # apply clipping
+        lines = self.im[rows].astype(self.dtype)
+        lines = (
+            (lines.clip(clip_min, clip_max) - clip_min) * 255 / (clip_max - clip_min)
+        )
 
-            y_offset = repeat_head_tail(y_offset, self.inter)
-            L = repeat_head_tail(L, self.inter)
-            x0 = repeat_head_tail(x0, self.inter)
+        thickness = y_max - lines * (y_max - y_min) / 255
+        y_offset = np.repeat(thickness[:, :-1], self.inter, axis=1)
+        L = np.repeat(thickness[:, 1:], self.inter, axis=1) - y_offset
 
-            y_top: np.ndarray = i + (
-                L / (1 + np.exp(-self.k * (self._x() - x0)))
-            ) + y_offset
-            y_bot: np.ndarray = 2 * i + 1 - y_top
+        y_offset = repeat_head_tail(y_offset, self.inter)
+        L = repeat_head_tail(L, self.inter)
 
-            y.append((y_top, y_bot))
+        # each line steps between pixel thicknesses along the shared sigmoid kernel
+        rows = rows.astype(self.dtype)[:, None]
+        y = np.empty((2, len(rows), self.w * self.inter), dtype=self.dtype)
+        np.multiply(L, self._kernel(), out=y[0])
+        y[0] += rows
+        y[0] += y_offset
+        np.subtract(2 * rows + 1, y[0], out=y[1])
 
         return y
 
-    @lru_cache()
-    def _noise(self, noise: Optional[Noise]) -> NoiseData:
-        if noise is not None:
-            return noise(self.h, self.w * self.inter)
-        else:
+    @cached
+    def _y(
+        self,
+        weights: Tuple[float, float],
+        weight_clipping: Tuple[float, float],
+        skip: int,
+    ) -> YData:
+        # per line (y_top, y_bot) views over the batched array
+        y_top, y_bot = self._y_array(weights, weight_clipping, skip)
+        return list(zip(y_top, y_bot))
+
+    @cached
+    def _noise(self, noise: Optional[Noise], seed: Optional[int] = None) -> NoiseData:
+        if noise is None:
             return [(0, 0) for _ in range(self.h)]
+        m, n = self.h, self.w * self.inter
+        if seed is None or (self._store is None and self._disk_cache is None):
+            return noise(m, n, seed, self.dtype)
+
+        key = digest('noise', noise, seed, m, n, self.dtype.str)
+        if self._store is None:
+            noise_top, noise_bot = self._disk_cache.get(
+                key, lambda: noise.generate(m, n, seed, self.dtype)
+            )
+        else:
+            # the store fills the array band by band in order, which the stream generates without repeating draws
+            stream = noise.stream(m, n, seed, self.dtype)
+            noise_top, noise_bot = self._store.array(
+                key,
+                (2, m, n),
+                self.dtype,
+                lambda lines: stream.generate(range(m)[lines]),
+            )
+        return list(zip(noise_top, noise_bot))
 
-    def _colour(self, colour: Union[str, Iterable, Colour]) -> ColourData:
+    # output of the modifiers, keyed by every draw parameter the modified lines depend on
+    _modified = cache_slot()
+
+    @cached
+    def _colour(
+        self, colour: Union[str, Iterable, Colour], skip: int = 0
+    ) -> ColourData:
         if isinstance(colour, str):
             return [colour]
         if isinstance(colour, Iterable):
             return colour
         if isinstance(colour, Colour):
-            return colour(self.h)
+            c = colour(self.h, skip) if colour.supports_skip else colour(self.h)
+            if isinstance(c, np.ndarray):
+                # the cached colours are shared by every draw with an equal colour. A read only view, as the
+                # array may be one the colour object keeps
+                c = c.view()
+                c.flags.writeable = False
+            return c
 
     def draw(
         self,
@@ -230,7 +375,9 @@ class SpeckPlot:
         modifiers: Optional[Iterable[Modifier]] = None,
         seed: Optional[int] = None,
         ax: Optional[Axis] = None,
-    ) -> figure:
+        backend: str = 'matplotlib',
+        profile: bool = False,
+    ) -> Union[Figure, Image.Image]:
         """
         Render the input image to produce a matplotlib figure
 
@@ -246,51 +393,390 @@ class SpeckPlot:
         :param colour: colour or list of colours or Colour object that is called and applied to lines
         :param skip: number of lines of pixels to skip for each plotted line
         :param background: background colour of output plot
-        :param modifiers: list of Modifier objects that are iteratively applied to the output x, y, noise and colour data
+        :param modifiers: list of Modifier objects or a ModifierPipeline that is applied to the output x, y, noise and
+                colour data. The output is cached, so redrawing with an equal chain of modifiers is free
         :param seed: random seed value
         :param ax: optional Axis object to plot on to
-        :return: matplotlib figure object containing the plot
+        :param backend: how the lines are rendered
+                'matplotlib': draw each line with fill_between onto a matplotlib figure
+                'raster': scan-convert lines directly into an image buffer, much faster for large images
+        :param profile: record the time, cache hits and misses and peak memory of each stage in self.last_profile
+        :return: matplotlib figure object containing the plot, or a PIL Image with the raster backend
         """
 
-        if seed is not None:
-            np.random.seed(seed)
+        if backend not in ['matplotlib', 'raster']:
+            raise ValueError(
+                'Invalid backend. Supported backends are: matplotlib, raster'
+            )
 
-        x = self._x()
-        y = self._y(weights, weight_clipping, skip)
-        n = self._noise(noise)
-        c = self._colour(colour)
+        with Profile(profile) as p:
+            if profile:
+                self.last_profile = p
+            return self._draw(
+                p,
+                weights,
+                weight_clipping,
+                noise,
+                colour,
+                skip,
+                background,
+                modifiers,
+                seed,
+                ax,
+                backend,
+            )
+
+    def _draw(
+        self,
+        p: Profile,
+        weights: Tuple[float, float],
+        weight_clipping: Tuple[float, float],
+        noise: Optional[Noise],
+        colour: Union[str, Iterable, Colour],
+        skip: int,
+        background: Union[str, Tuple[float, ...]],
+        modifiers: Optional[Iterable[Modifier]],
+        seed: Optional[int],
+        ax: Optional[Axis],
+        backend: str,
+    ) -> Union[Figure, Image.Image]:
+        with p.stage('x', [self._x]):
+            x = self._x()
+        with p.stage('y', [self._y, self._y_array]):
+            y = self._y(weights, weight_clipping, skip)
+        with p.stage('noise', [self._noise]):
+            n = self._noise(noise, seed)
+        with p.stage('colour', [self._colour]):
+            c = self._colour(colour, skip)
 
         # run modifiers if necessary
         if modifiers is not None:
-            for m in modifiers:
-                x, y, n, c = m(x, y, n, c)
+            modifiers = ModifierPipeline(modifiers, profile=p)
+            modified_key = (
+                weights,
+                weight_clipping,
+                skip,
+                noise,
+                seed,
+                tuple(colour) if isinstance(colour, list) else colour,
+                modifiers,
+            )
+            with p.stage('modifiers', [self._modified]):
+                modified = self._modified.get(modified_key)
+            if modified is None:
+                # the pipeline measures each modifier, or group of fused LineModifiers, as its own stage
+                modified = modifiers(x, y, n, c)
+                self._modified.put(modified_key, modified)
+            x, y, n, c = modified
+
+        facecolors = rgba_array(c, len(y))
+        key = (weights, weight_clipping, skip, noise, seed, modifiers, self.k)
+        try:
+            hash(key)
+        except TypeError:
+            # unhashable parameters, eg. a modifier holding a dict, may have been changed in place so always redraw
+            key = None
+        self._lines = x, y, n, facecolors, background
+
+        if backend == 'raster':
+            raster_key = (
+                None if key is None else key + (facecolors.tobytes(), background)
+            )
+            if (
+                raster_key is not None
+                and self._raster is not None
+                and raster_key == self._raster_key
+            ):
+                # nothing changed since the last draw, callers get a copy so they can't change the stored image
+                return self._raster[2].copy()
+
+            with p.stage('rasterize'):
+                shape = round(self.h * self.scale), round(self.w * self.scale)
+                layer = rasterize(x, y, n, facecolors, shape, self.scale, self.dtype)
+                if not self.horizontal:
+                    layer = np.rot90(layer)
+            with p.stage('image'):
+                image = to_image(layer, background)
+            self._raster = layer, background, image
+            self._raster_key = raster_key
+            return image.copy()
 
         # create plot elements
+        self._raster = None
         if ax is not None:
             self.ax = ax
-        self._clear_ax(background)
-        for y_, n_, c_ in zip(y, cycle(n), cycle(c)):
-            y_top = y_[0] + n_[0]
-            y_bot = y_[1] + n_[1]
 
-            if self.horizontal:
-                self.ax.fill_between(x, y_top, y_bot, color=c_, lw=0)
-            else:
-                self.ax.fill_betweenx(x, y_top, y_bot, color=c_, lw=0)
+        key = None if key is None else key + (self.ax,)
+        if (
+            key is not None
+            and key == self._collection_key
+            and self._collection in self.ax.collections
+        ):
+            # only the colour or background changed, so recolour the existing lines rather than redrawing them
+            with p.stage('recolour'):
+                self.ax.set_facecolor(background)
+                self._collection.set_facecolor(facecolors)
+            return self.fig
+
+        # every line is added to the axes as a polygon in a single collection
+        with p.stage('polygons'):
+            self._clear_ax(background)
+            self._collection = PolyCollection(
+                self._polygons(x, y, n), facecolors=facecolors, linewidths=0
+            )
+            self.ax.add_collection(self._collection, autolim=False)
+            self._collection_key = key
 
         return self.fig
 
-    def save(self, path: str, transparent: bool = False) -> None:
+    def _polygons(
+        self, x: Union[XData, LineXData], y: YData, n: NoiseData
+    ) -> Union[np.ndarray, List[np.ndarray]]:
+        # outline of each line: along the top edge and back along the bottom edge
+        # (line direction, line position) pairs for horizontal lines, swapped for vertical lines
+        c = [0, 1] if self.horizontal else [1, 0]
+
+        if isinstance(x, list):
+            polygons = []
+            for x_, y_, n_ in zip(x, y, cycle(n)):
+                polygon = np.empty((2 * len(x_), 2), dtype=self.dtype)
+                polygon[:, c[0]] = np.concatenate([x_, x_[::-1]])
+                polygon[: len(x_), c[1]] = y_[0] + n_[0]
+                polygon[len(x_) :, c[1]] = (y_[1] + n_[1])[::-1]
+                polygons.append(polygon)
+            return polygons
+
+        # all lines share x, so build every polygon at once
+        polygons = np.empty((len(y), 2 * len(x), 2), dtype=self.dtype)
+        polygons[:, :, c[0]] = np.concatenate([x, x[::-1]])
+        for polygon, y_, n_ in zip(polygons, y, cycle(n)):
+            polygon[: len(x), c[1]] = y_[0] + n_[0]
+            polygon[len(x) :, c[1]] = (y_[1] + n_[1])[::-1]
+        return polygons
+
+    def _bands(
+        self,
+        weights: Tuple[float, float],
+        weight_clipping: Tuple[float, float],
+        skip: int,
+        noise: Optional[Noise],
+        seed: Optional[int],
+        band: int,
+    ) -> Iterator[Tuple[range, YArray]]:
+        # (lines, y) for band lines at a time, where y holds the line edges with noise added
+        rows = np.arange(0, self.h, skip + 1)
+        if noise is not None:
+            stream = noise.stream(self.h, self.w * self.inter, seed, self.dtype)
+        for start in range(0, len(rows), band):
+            lines = range(start, min(start + band, len(rows)))
+            y = self._y_rows(rows[start : lines.stop], weights, weight_clipping)
+            if noise is not None:
+                y += stream.generate(lines)
+
+            yield lines, y
+
+    def draw_tiled(
+        self,
+        path: Union[str, BinaryIO],
+        weights: Tuple[float, float] = (0, 1),
+        weight_clipping: Tuple[float, float] = (0, 1),
+        noise: Optional[Noise] = None,
+        colour: Union[str, Iterable, Colour] = 'black',
+        skip: int = 0,
+        background: Union[str, Tuple[float, ...]] = 'white',
+        seed: Optional[int] = None,
+        transparent: bool = False,
+        band: int = 64,
+    ) -> None:
+        """
+        Render the input image straight to a png file, band by band, for very large outputs.
+        Only band lines of geometry and noise, and the rows of pixels they cover, are held in memory at a time.
+        The output matches draw(backend='raster') followed by save(). Modifiers are not supported.
+
+        :param path: path to save location, or a binary file object to write the png to
+        :param weights: min and max line widths
+        :param weight_clipping: proportion of greys that map to min and max weights
+        :param noise: Noise object that is called and added onto thickness values
+        :param colour: colour or list of colours or Colour object that is called and applied to lines
+        :param skip: number of lines of pixels to skip for each plotted line
+        :param background: background colour of output plot
+        :param seed: random seed value
+        :param transparent: whether to save with a transparent background
+        :param band: number of lines that are generated and rendered at a time
         """
-        Save rendered figure to disk. Call this after the draw method
-        :param path: path to save location
-        :param transparent: whether to save with a transparent background (assuming .png extension)
+
+        if not self.horizontal:
+            raise ValueError('Tiled rendering only supports horizontal lines')
+
+        if seed is None:
+            # every band has to draw from the same seeded random stream
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+
+        x = self._x()
+        c = rgba_array(self._colour(colour, skip), len(range(0, self.h, skip + 1)))
+        background = None if transparent else background
+
+        height, width = round(self.h * self.scale), round(self.w * self.scale)
+        layer = np.zeros((0, width, 4), dtype=self.dtype)
+        written = 0  # number of rows of pixels already written to the file
+
+        with PNGWriter(path, width, height) as writer:
+            for lines, y in self._bands(
+                weights, weight_clipping, skip, noise, seed, band
+            ):
+                top = min(max(int(np.floor(y.min() * self.scale)), 0), height)
+                bottom = min(max(int(np.ceil(y.max() * self.scale)), top), height)
+                if top < written:
+                    logger.warning(
+                        'Lines extend above the previous band and are clipped. Increase band to avoid this.'
+                    )
+
+                if bottom > written + len(layer):
+                    extra = np.zeros(
+                        (bottom - written - len(layer), width, 4), dtype=self.dtype
+                    )
+                    layer = np.concatenate([layer, extra])
+
+                # lines are drawn in order, so rows above this band are complete and can be written out
+                if top > written:
+                    writer.write(to_rgba8(layer[: top - written], background))
+                    layer = layer[top - written :]
+                    written = top
+
+                rasterize(
+                    x,
+                    list(zip(*y)),
+                    [(0, 0)],
+                    c[lines.start : lines.stop],
+                    layer.shape[:2],
+                    self.scale,
+                    layer=layer,
+                    offset=written,
+                )
+
+            layer = np.concatenate(
+                [
+                    layer,
+                    np.zeros((height - written - len(layer), width, 4), self.dtype),
+                ]
+            )
+            writer.write(to_rgba8(layer, background))
+
+    def animate(
+        self,
+        schedule: Iterable[Dict[str, Any]],
+        writer: Union[str, FrameWriter],
+        workers: Optional[int] = None,
+        **params,
+    ) -> int:
         """
+        Render a sequence of frames with the raster backend and stream them to a writer in order.
+        Only what changes between frames is recomputed: geometry, noise, colours and modifier output are cached
+        and reused for as long as the parameters they depend on stay the same.
+
+        eg. a looping phase shift of the noise:
+            s.animate(
+                [{'noise': SineNoise(phase_offset_range=(a, a + 360))} for a in range(0, 360, 5)],
+                'frames/{:03d}.png',
+                weights=(0.2, 0.9),
+                seed=1,
+            )
 
-        self.fig.savefig(
-            path,
-            dpi=self.dpi,
-            bbox_inches='tight',
-            pad_inches=0,
-            transparent=transparent,
-        )
+        :param schedule: draw parameters of each frame, which override params
+        :param writer: FrameWriter to write frames to, or a format string of frame paths eg. 'frames/{:04d}.png'.
+                The writer is closed once every frame is written
+        :param workers: number of worker processes that render contiguous runs of frames in parallel.
+                Frames are rendered in this process when None
+        :param params: draw parameters shared by every frame, see draw
+        :return: number of frames written
+        """
+
+        if isinstance(writer, str):
+            writer = ImageSequenceWriter(writer)
+        if params.get('seed') is None:
+            # every frame, and every worker, has to draw the same random noise
+            params['seed'] = int(np.random.SeedSequence().generate_state(1)[0])
+        for k in ['backend', 'ax', 'profile']:
+            if k in params:
+                raise ValueError(f'{k} is not supported by animate')
+
+        frames = [{**params, **frame} for frame in schedule]
+        with writer:
+            if workers is None:
+                for frame in frames:
+                    writer.write(self.draw(backend='raster', **frame))
+                return len(frames)
+
+            with ProcessPoolExecutor(
+                workers,
+                initializer=_init_worker,
+                initargs=(
+                    self.image,
+                    self.scale,
+                    self.horizontal,
+                    self.dtype,
+                    self.k,
+                    None if self._store is None else self._store.directory,
+                    self._disk_cache,
+                ),
+            ) as executor:
+                # contiguous runs of frames per worker, so each worker can reuse its geometry between frames
+                chunksize = max(1, len(frames) // (4 * workers))
+                for image in executor.map(_render_frame, frames, chunksize=chunksize):
+                    writer.write(image)
+
+        return len(frames)
+
+    def save(
+        self,
+        path: Union[str, BinaryIO],
+        transparent: bool = False,
+        profile: bool = False,
+        tolerance: Optional[float] = 0.01,
+    ) -> None:
+        """
+        Save rendered figure to disk. Call this after the draw method.
+        Paths ending in .svg or .pdf are written directly from the line geometry, one filled path per line.
+        :param path: path to save location, or a binary file object to write a png to
+        :param transparent: whether to save with a transparent background (assuming .png, .svg or .pdf extension)
+        :param profile: record the time and peak memory of saving in self.last_profile
+        :param tolerance: for .svg and .pdf, the distance in units of line spacing that simplified line edges may
+                stray from the drawn edges. Larger values give smaller files, None keeps every point
+        """
+
+        with Profile(profile) as p, p.stage('save'):
+            if profile:
+                self.last_profile = p
+
+            extension = (
+                path.lower().rsplit('.', 1)[-1] if isinstance(path, str) else None
+            )
+            if extension in ('svg', 'pdf') and self._lines is not None:
+                x, y, n, facecolors, background = self._lines
+                write = write_svg if extension == 'svg' else write_pdf
+                write(
+                    path,
+                    outlines(x, y, n, tolerance),
+                    facecolors,
+                    self.w,
+                    self.h,
+                    self.scale * 72 / self.dpi,
+                    self.horizontal,
+                    None if transparent else background,
+                )
+                return
+
+            if self._raster is not None:
+                layer, background, _ = self._raster
+                to_image(layer, None if transparent else background).save(
+                    path, format=None if isinstance(path, str) else 'png'
+                )
+                return
+
+            self.fig.savefig(
+                path,
+                dpi=self.dpi,
+                bbox_inches='tight',
+                pad_inches=0,
+                transparent=transparent,
+            )
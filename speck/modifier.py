@@ -1,24 +1,189 @@
-__all__ = ['LineUnionModifier']
+__all__ = [
+    'LineUnionModifier',
+    'AdaptiveSampleModifier',
+    'LineModifier',
+    'ModifierPipeline',
+]
 
-from typing import Iterable, Tuple, Union, Callable
-from functools import partial
+from typing import Iterable, Tuple, Union, Callable, Optional, List
+from itertools import cycle, repeat, islice
 from abc import ABC, abstractmethod
 
 import numpy as np
 
-from speck.types import XData, YData, NoiseData, ColourData
+from speck.profile import Profile
+from speck.types import XData, LineXData, YData, YArray, NoiseData, ColourData
 
 
 class Modifier(ABC):
+    def __repr__(self):
+        """
+        Auto __repr__ based on instance __dict__
+        Parameters with a leading _ are omitted from the repr and thus from the hash
+        """
+
+        d = [f'{k}={v}' for k, v in self.__dict__.items() if not k.startswith('_')]
+        return f'{self.__class__.__name__}({", ".join(d)})'
+
+    def _params(self) -> tuple:
+        # the class is part of the parameters, as different modifiers can have the same parameter values
+        p = [self.__class__]
+        for k, v in self.__dict__.items():
+            if not k.startswith('_'):
+                p.append(tuple(v) if isinstance(v, (list, np.ndarray)) else v)
+
+        return tuple(p)
+
+    def __hash__(self):
+        # raises TypeError if a parameter is unhashable, so draws with the modifier are not cached
+        return hash(self._params())
+
+    def __eq__(self, other):
+        if not isinstance(other, Modifier):
+            return NotImplemented
+        try:
+            return bool(self._params() == other._params())
+        except ValueError:
+            # elementwise comparison of array parameters is ambiguous
+            return self is other
+
     @abstractmethod
     def __call__(
-        self, x: XData, y: YData, n: NoiseData, c: ColourData,
+        self,
+        x: XData,
+        y: YData,
+        n: NoiseData,
+        c: ColourData,
     ) -> Tuple[
-        XData, YData, NoiseData, ColourData,
+        XData,
+        YData,
+        NoiseData,
+        ColourData,
     ]:
         pass
 
 
+class LineModifier(Modifier):
+    """
+    Modifier that changes each line independently of the other lines.
+    Consecutive LineModifiers in a ModifierPipeline are fused and applied one line at a time.
+    Create your own by implementing modify_line.
+    """
+
+    @abstractmethod
+    def modify_line(
+        self,
+        x: np.ndarray,
+        y: Tuple[np.ndarray, np.ndarray],
+        n: Tuple[Union[np.ndarray, int], Union[np.ndarray, int]],
+    ) -> Tuple[
+        np.ndarray,
+        Tuple[np.ndarray, np.ndarray],
+        Tuple[Union[np.ndarray, int], Union[np.ndarray, int]],
+    ]:
+        # x = x values of the line
+        # y = (y_top, y_bot) of the line
+        # n = (noise_top, noise_bot) of the line
+        # returns modified (x, y, n), x should be returned unchanged (the same object) if not modified
+        pass
+
+    def __call__(
+        self,
+        x: Union[XData, LineXData],
+        y: YData,
+        n: NoiseData,
+        c: ColourData,
+    ) -> Tuple[
+        Union[XData, LineXData],
+        YData,
+        NoiseData,
+        ColourData,
+    ]:
+        return _fuse([self], x, y, n) + (c,)
+
+
+class ModifierPipeline(Modifier):
+    def __init__(
+        self, modifiers: Iterable[Modifier], profile: Optional[Profile] = None
+    ):
+        """
+        Chain of modifiers that are applied in order, as passed to SpeckPlot.draw.
+        Consecutive LineModifiers are fused into a single pass over the lines, so only one line at a time
+        goes through the chain rather than a full copy of every line per modifier.
+        Pipelines are equal when their modifiers are, so SpeckPlot caches and reuses their output.
+        :param modifiers: list of Modifier objects, nested pipelines are flattened
+        :param profile: Profile that each modifier, or group of fused LineModifiers, is measured in as a stage
+        """
+
+        self._profile = Profile(enabled=False) if profile is None else profile
+
+        self.modifiers = tuple(
+            m
+            for modifier in modifiers
+            for m in (
+                modifier.modifiers
+                if isinstance(modifier, ModifierPipeline)
+                else [modifier]
+            )
+        )
+
+    def __call__(
+        self,
+        x: Union[XData, LineXData],
+        y: YData,
+        n: NoiseData,
+        c: ColourData,
+    ) -> Tuple[
+        Union[XData, LineXData],
+        YData,
+        NoiseData,
+        ColourData,
+    ]:
+        fused = []
+        for i, m in enumerate(self.modifiers + (None,)):
+            if isinstance(m, LineModifier):
+                fused.append(m)
+                continue
+
+            if fused:
+                with self._profile.stage(_stage_name(i - len(fused), fused)):
+                    x, y, n = _fuse(fused, x, y, n)
+                fused = []
+            if m is not None:
+                with self._profile.stage(_stage_name(i, [m])):
+                    x, y, n, c = m(x, y, n, c)
+
+        return x, y, n, c
+
+
+def _stage_name(start: int, modifiers: List[Modifier]) -> str:
+    # eg. 'modifier[2] LineUnionModifier', or 'modifier[0:2] ShiftModifier+ShiftModifier' for fused modifiers
+    index = str(start) if len(modifiers) == 1 else f'{start}:{start + len(modifiers)}'
+    return f'modifier[{index}] {"+".join(m.__class__.__name__ for m in modifiers)}'
+
+
+def _fuse(
+    modifiers: Iterable[LineModifier],
+    x: Union[XData, LineXData],
+    y: YData,
+    n: NoiseData,
+) -> Tuple[Union[XData, LineXData], YData, NoiseData]:
+    # pass each line through every modifier in turn, so intermediate results only exist for one line
+    x_, y_, n_ = [], [], []
+    for line in zip(x if isinstance(x, list) else repeat(x), y, cycle(n)):
+        for m in modifiers:
+            line = m.modify_line(*line)
+        x_.append(line[0])
+        y_.append(line[1])
+        n_.append(line[2])
+
+    if not isinstance(x, list) and all(v is x for v in x_):
+        # x is still shared by every line
+        x_ = x
+
+    return x_, y_, n_
+
+
 class LineUnionModifier(Modifier):
     def __init__(
         self, thicknesses: Iterable[int], aggregation: Union[str, Callable] = 'sum'
@@ -31,49 +196,167 @@ class LineUnionModifier(Modifier):
                         - second line is the union of second and third line
                         - third line is the union of the next 3 lines, etc...
                         - speck_plot.h should be 15 in this example
-        :param aggregation: aggregation method to apply to sets of combined lines
+        :param aggregation: aggregation method to apply to sets of combined lines, 'sum', 'mean' or a Callable
+                    that is passed a list of the combined lines' edges and returns the aggregated edge
         """
 
         if 0 in thicknesses:
             raise AssertionError('Invalid thickness: 0')
         self.thicknesses = thicknesses
 
-        if isinstance(aggregation, str):
-            if aggregation not in ['sum', 'mean']:
-                raise ValueError(
-                    'Unsupported aggregation: Supported aggregations are sum, mean or custom Callable'
-                )
-            aggregation = (
-                partial(np.sum, axis=0)
-                if aggregation == 'sum'
-                else partial(np.mean, axis=0)
+        if isinstance(aggregation, str) and aggregation not in ['sum', 'mean']:
+            raise ValueError(
+                'Unsupported aggregation: Supported aggregations are sum, mean or custom Callable'
             )
 
         self.aggregation = aggregation
 
     def __call__(
-        self, x: XData, y: YData, n: NoiseData, c: ColourData,
+        self,
+        x: XData,
+        y: YData,
+        n: NoiseData,
+        c: ColourData,
     ) -> Tuple[
-        XData, YData, NoiseData, ColourData,
+        XData,
+        YData,
+        NoiseData,
+        ColourData,
     ]:
         if sum(self.thicknesses) != len(y):
             raise AssertionError('sum(thicknesses) != number of lines')
 
-        pos = 0
-        y_ = []
-        for t in self.thicknesses:
-            y_top = (
-                self.aggregation([y[pos + i][0] - pos - i - 0.5 for i in range(t)])
-                + pos
-                + t / 2
+        edges = _stack(y)
+        t = np.asarray(self.thicknesses)
+        starts = np.concatenate([[0], np.cumsum(t)[:-1]])
+        centres = (starts + t / 2).astype(edges.dtype)
+
+        # each line is shifted to be centred on 0 before aggregating, and the group is centred on its rows:
+        #   aggregation(y[pos + i] - pos - i - 0.5 for i in range(t)) + pos + t / 2
+        if isinstance(self.aggregation, str):
+            # consecutive groups of equal thickness are summed together as one (2, groups, thickness, points) block
+            y_ = np.empty((2, len(t), edges.shape[2]), dtype=edges.dtype)
+            runs = np.append(np.flatnonzero(np.diff(t, prepend=0)), len(t))
+            for g0, g1 in zip(runs[:-1], runs[1:]):
+                block = edges[:, starts[g0] : starts[g0] + (g1 - g0) * t[g0]]
+                block.reshape(2, g1 - g0, t[g0], -1).sum(axis=2, out=y_[:, g0:g1])
+
+            # the shifts of a group's lines sum to t * pos + t ** 2 / 2, so only the raw edges need summing
+            if self.aggregation == 'mean':
+                y_ /= t[:, None]
+            else:
+                y_ -= ((t - 1) * centres)[:, None]
+        else:
+            # custom aggregations get a list of each group's shifted lines, as they always have
+            shifted = edges - (np.arange(len(y)) + 0.5).astype(edges.dtype)[:, None]
+            y_ = np.array(
+                [
+                    [self.aggregation(list(e[s : s + t_])) for s, t_ in zip(starts, t)]
+                    for e in shifted
+                ],
+                dtype=edges.dtype,
             )
-            y_bot = (
-                self.aggregation([y[pos + i][1] - pos - i - 0.5 for i in range(t)])
-                + pos
-                + t / 2
+            y_ += centres[:, None]
+
+        return x, list(zip(*y_)), n, c
+
+
+def _stack(y: YData) -> YArray:
+    # (2, lines, points) array of line edges. When the lines are views over such an array, as returned by
+    # SpeckPlot._y, that array is returned rather than a copy
+    base = y[0][0].base
+    if isinstance(base, np.ndarray) and base.shape[:2] == (2, len(y)):
+        start = base.__array_interface__['data'][0]
+        offsets = [
+            (
+                top.__array_interface__['data'][0] - start,
+                bot.__array_interface__['data'][0] - start,
             )
+            for top, bot in y
+        ]
+        expected = np.arange(len(y))[:, None] * base.strides[1] + [0, base.strides[0]]
+        if all(
+            l.base is base
+            and l.shape == base.shape[2:]
+            and l.strides == base.strides[2:]
+            for line in y
+            for l in line
+        ) and np.array_equal(offsets, expected):
+            return base
+
+    return np.asarray(y).transpose(1, 0, 2)
+
+
+class AdaptiveSampleModifier(Modifier):
+    # number of lines refined together, bounds the size of the temporary arrays
+    band = 16
+
+    def __init__(self, tolerance: float = 0.01):
+        """
+        Resamples each line independently, keeping only the points needed to follow its edges within tolerance.
+        Points are kept where the line's thickness changes and where noise curves the edges, while flat sections
+        between pixels of equal grey are reduced to their end points.
+        Noise is added onto the resampled edges and each line gets its own x values, so this should be the last modifier.
+        :param tolerance: maximum distance, in units of line spacing, between the resampled and original line edges
+        """
+
+        self.tolerance = tolerance
+
+    def __call__(
+        self,
+        x: XData,
+        y: YData,
+        n: NoiseData,
+        c: ColourData,
+    ) -> Tuple[
+        LineXData,
+        YData,
+        NoiseData,
+        ColourData,
+    ]:
+        if isinstance(x, list):
+            raise AssertionError('Lines have already been resampled')
+
+        # lines are refined a band at a time, so the temporaries are a few times the size of a band of lines
+        # rather than of the whole image
+        x_, y_ = [], []
+        lines = zip(y, cycle(n))
+        while True:
+            band = list(islice(lines, self.band))
+            if not band:
+                break
+
+            # edges of shape (lines, 2, points)
+            edges = np.array([(l[0] + n_[0], l[1] + n_[1]) for l, n_ in band])
+            for e, k in zip(edges, self._keep(x, edges)):
+                x_.append(x[k])
+                y_.append((e[0, k], e[1, k]))
+
+        return x_, y_, [(0, 0)], c
+
+    def _keep(self, x: XData, edges: np.ndarray) -> np.ndarray:
+        # (lines, points) mask of the points each line keeps
+        lines, points = edges.shape[0], len(x)
+        idx = np.arange(points)
+
+        # start from the end points of each line and repeatedly split any interval whose linear interpolation
+        # strays from the edges by more than tolerance, until every interval is within tolerance
+        keep = np.zeros((lines, points), dtype=bool)
+        keep[:, [0, -1]] = True
+        while True:
+            prev = np.maximum.accumulate(np.where(keep, idx, 0), axis=1)
+            next_ = np.minimum.accumulate(
+                np.where(keep, idx, points - 1)[:, ::-1], axis=1
+            )[:, ::-1]
 
-            y_.append((y_top, y_bot))
-            pos += t
+            span = x[next_] - x[prev]
+            t = np.divide(x - x[prev], span, out=np.zeros(span.shape), where=span > 0)
+            prev, next_, t = prev[:, None], next_[:, None], t[:, None]
+            start = np.take_along_axis(edges, prev, axis=2)
+            interp = start + t * (np.take_along_axis(edges, next_, axis=2) - start)
+            error = np.abs(edges - interp).max(axis=1)
 
-        return x, y_, n, c
+            line, i = np.nonzero(error > self.tolerance)
+            if not len(line):
+                return keep
+            keep[line, (prev[line, 0, i] + next_[line, 0, i]) // 2] = True
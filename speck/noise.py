@@ -1,9 +1,12 @@
 __all__ = ['RandomNoise', 'SineNoise']
 
-from typing import List, Tuple, Union, Iterable
+from typing import Tuple, Union, Iterable, Optional, Dict
 from abc import ABC, abstractmethod
 
 import numpy as np
+from numpy.typing import DTypeLike
+
+from speck.types import NoiseData, NoiseArray
 
 
 class Noise(ABC):
@@ -35,29 +38,183 @@ class Noise(ABC):
     def __eq__(self, other):
         return hash(self) == hash(other)
 
-    def __call__(self, m: int, n: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    def __call__(
+        self,
+        m: int,
+        n: int,
+        seed: Optional[int] = None,
+        dtype: DTypeLike = np.float64,
+    ) -> NoiseData:
         # m = number of rows (lines)
         # n = number of points per line
 
-        noise_a = []
+        noise_top, noise_bot = self.generate(m, n, seed, dtype)
+        return list(zip(noise_top, noise_bot))
+
+    def generate(
+        self,
+        m: int,
+        n: int,
+        seed: Optional[int] = None,
+        dtype: DTypeLike = np.float64,
+        lines: Optional[Iterable[int]] = None,
+    ) -> NoiseArray:
+        """
+        Generate the noise for every line at once
+        :param m: number of rows (lines)
+        :param n: number of points per line
+        :param seed: random seed value
+        :param dtype: float dtype of the generated noise
+        :param lines: only generate the noise of these lines (out of m), use stream to generate noise band by band
+        :return: array of shape (2, m, n) holding the top and bottom edge noise of each line
+        """
+
+        return self.stream(m, n, seed, dtype).generate(
+            range(m) if lines is None else lines
+        )
+
+    def stream(
+        self,
+        m: int,
+        n: int,
+        seed: Optional[int] = None,
+        dtype: DTypeLike = np.float64,
+    ) -> 'NoiseStream':
+        """
+        Stream of the noise of m lines, for generating it band by band
+        :param m: number of rows (lines)
+        :param n: number of points per line
+        :param seed: random seed value
+        :param dtype: float dtype of the generated noise
+        """
+
+        return NoiseStream(self, m, n, seed, dtype)
+
+    def _generate_lines(
+        self,
+        n: int,
+        rng: np.random.RandomState,
+        lines: np.ndarray,
+        dtype: DTypeLike = np.float64,
+        position: int = 0,
+    ) -> np.ndarray:
+        # noise of lines, drawn from rng which is at the start of line position, leaves rng after the last of them
+        if len(np.unique(lines)) != len(lines):
+            raise ValueError('lines must be unique')
+        if not len(lines):
+            return np.empty((0, n), dtype=dtype)
+
+        if np.array_equal(lines, np.arange(position, position + len(lines))):
+            # the lines follow on from rng's position, as when generating every line or the next band of lines
+            return self._generate_batch(len(lines), n, rng, dtype)
+
+        order = np.argsort(lines)
+        ordered = lines[order]
+        # runs of consecutive lines are drawn together, the gaps between runs are skipped
+        bounds = np.flatnonzero(np.diff(ordered) != 1) + 1
+        starts = np.concatenate([[0], bounds]).astype(int)
+        ends = np.concatenate([bounds, [len(lines)]]).astype(int)
+
+        noise = np.empty((len(lines), n), dtype=dtype)
+        for start, end in zip(starts, ends):
+            self._skip(ordered[start] - position, n, rng)
+            noise[order[start:end]] = self._generate_batch(end - start, n, rng, dtype)
+            position = ordered[end - 1] + 1
+
+        return noise
+
+    def _generate_batch(
+        self,
+        m: int,
+        n: int,
+        rng: np.random.RandomState,
+        dtype: DTypeLike = np.float64,
+    ) -> np.ndarray:
+        # noise of m lines drawn in turn from rng as an (m, n) array
+        # override with a vectorised implementation where possible
+        return np.array([self._generate(n, rng) for _ in range(m)], dtype=dtype)
+
+    def _skip(self, m: int, n: int, rng: np.random.RandomState) -> None:
+        # advance rng past the draws of m lines
+        # override with an implementation that only makes the draws where possible
         for _ in range(m):
-            noise_a.append(self._generate(n))
-
-        if self.profile == 'parallel':
-            return [(yn, yn) for yn in noise_a]
-        if self.profile == 'reflect':
-            return [(yn, -yn) for yn in noise_a]
-        if self.profile == 'independent':
-            noise_b = []
-            for _ in range(m):
-                noise_b.append(self._generate(n))
-            return [(a, b) for a, b in zip(noise_a, noise_b)]
+            self._generate(n, rng)
 
     @abstractmethod
-    def _generate(self, n: int) -> np.ndarray:
+    def _generate(self, n: int, rng: np.random.RandomState) -> np.ndarray:
         pass
 
 
+class NoiseStream:
+    def __init__(
+        self,
+        noise: Noise,
+        m: int,
+        n: int,
+        seed: Optional[int] = None,
+        dtype: DTypeLike = np.float64,
+    ):
+        """
+        Noise of m lines that is generated a subset of lines at a time, eg. band by band.
+        The lines draw in turn from one seeded np.random.RandomState, every top edge and then every bottom edge,
+        as they did from np.random.seed(seed) in earlier versions, so seeded output (and the test baselines)
+        are unchanged. Line i's noise therefore depends on the draws of every line before it. Rather than
+        skipping those draws again for every band, the stream keeps its place in the top and bottom edge streams,
+        so generating the lines in increasing order makes each draw once.
+        :param noise: Noise object that generates the lines
+        :param m: number of rows (lines)
+        :param n: number of points per line
+        :param seed: random seed value
+        :param dtype: float dtype of the generated noise
+        """
+
+        self.noise = noise
+        self.m = m
+        self.n = n
+        # both edge streams start from the same state, so an unseeded stream picks its seed once
+        self.seed = (
+            int(np.random.SeedSequence().generate_state(1)[0]) if seed is None else seed
+        )
+        self.dtype = dtype
+        # edge -> (rng, line it is at) for the top (0) and bottom (1) edges
+        self._edges: Dict[int, Tuple[np.random.RandomState, int]] = {}
+
+    def generate(self, lines: Iterable[int]) -> NoiseArray:
+        """
+        Generate the noise of lines, fastest when each call's lines follow the previous call's
+        :param lines: lines (out of m) to generate the noise of
+        :return: array of shape (2, len(lines), n) holding the top and bottom edge noise of each line
+        """
+
+        lines = np.asarray(list(lines), dtype=int)
+        noise_a = self._edge(0, lines)
+
+        if self.noise.profile == 'parallel':
+            # both edges are views of the same buffer
+            return np.broadcast_to(noise_a, (2,) + noise_a.shape)
+
+        noise = np.empty((2,) + noise_a.shape, dtype=noise_a.dtype)
+        noise[0] = noise_a
+        if self.noise.profile == 'reflect':
+            np.negative(noise_a, out=noise[1])
+        if self.noise.profile == 'independent':
+            noise[1] = self._edge(1, lines)
+
+        return noise
+
+    def _edge(self, edge: int, lines: np.ndarray) -> np.ndarray:
+        rng, position = self._edges.get(edge, (None, 0))
+        if rng is None or (len(lines) and lines.min() < position):
+            # start again from the beginning of the stream, the bottom edges follow every top edge
+            rng, position = np.random.RandomState(self.seed), 0
+            if edge == 1:
+                self.noise._skip(self.m, self.n, rng)
+
+        noise = self.noise._generate_lines(self.n, rng, lines, self.dtype, position)
+        self._edges[edge] = rng, (lines.max() + 1 if len(lines) else position)
+        return noise
+
+
 class RandomNoise(Noise):
     def __init__(
         self,
@@ -80,18 +237,51 @@ class RandomNoise(Noise):
         self.scale = scale
         self.pull = pull
         self.mean_n = mean_n
+        # number of values drawn, or averaged, at a time
+        self._chunk = 2**18
 
         super().__init__(profile)
 
-    def _generate(self, n: int) -> np.ndarray:
-        res = np.array([0.0])
-        for _ in range(n):
-            r = np.random.normal(-res.sum() * self.pull, self.scale)
-            res = np.insert(res, -1, r)
+    def _generate(self, n: int, rng: np.random.RandomState) -> np.ndarray:
+        return self._generate_batch(1, n, rng)[0]
+
+    def _generate_batch(
+        self,
+        m: int,
+        n: int,
+        rng: np.random.RandomState,
+        dtype: DTypeLike = np.float64,
+    ) -> np.ndarray:
+        # s holds the running sums, s[:, 0] = 0 and s[:, i + 1] the sum of the first i + 1 steps.
+        # Steps are drawn a chunk of lines at a time, in line order as one draw would be, and cast into s,
+        # so that no full size float64 array is allocated
+        s = np.empty((m, n + 1), dtype=dtype)
+        s[:, 0] = 0
+        rows = max(1, self._chunk // max(n, 1))
+        for start in range(0, m, rows):
+            s[start : start + rows, 1:] = rng.normal(
+                0, self.scale, (min(rows, m - start), n)
+            )
+
+        # mean reverting random walk: each step is pulled back towards 0 by pull * (sum of previous steps)
+        # so the running sum follows the AR(1) process s[i] = (1 - pull) * s[i - 1] + e[i]
+        for i in range(n):
+            s[:, i + 1] += (1 - self.pull) * s[:, i]
+
+        # the moving average of the steps over the next mean_n values is a difference of running sums,
+        # written over s a block of points at a time: each block only reads sums from itself onwards
+        end = np.minimum(np.arange(n) + self.mean_n, n)
+        cols = max(1, self._chunk // max(m, 1))
+        for start in range(0, n, cols):
+            block = slice(start, min(start + cols, n))
+            s[:, block] = (s[:, end[block]] - s[:, block]) / self.mean_n
 
-        return np.convolve(res, np.ones((self.mean_n,)) / self.mean_n)[
-            (self.mean_n - 1) : -1
-        ]
+        return s[:, :n]
+
+    def _skip(self, m: int, n: int, rng: np.random.RandomState) -> None:
+        # n normal draws per line, made in bounded chunks
+        for size in np.diff(np.append(np.arange(0, m * n, 2**20), m * n)):
+            rng.standard_normal(size)
 
 
 class SineNoise(Noise):
@@ -127,20 +317,32 @@ class SineNoise(Noise):
 
         super().__init__(profile)
 
-    def _generate(self, n: int) -> np.ndarray:
-        return np.array(
-            [
-                self.scale
-                * np.sin(
-                    np.linspace(0, self.base_freq * 2 * np.pi, n) * factor + offset
-                )
-                for factor, offset in zip(
-                    np.random.uniform(*self.freq_factor, self.wave_count),
-                    np.random.uniform(
-                        np.deg2rad(self.phase_offset_range[0]),
-                        np.deg2rad(self.phase_offset_range[1]),
-                        self.wave_count,
-                    ),
-                )
-            ]
-        ).prod(axis=0)
+    def _generate(self, n: int, rng: np.random.RandomState) -> np.ndarray:
+        return self._generate_batch(1, n, rng)[0]
+
+    def _generate_batch(
+        self,
+        m: int,
+        n: int,
+        rng: np.random.RandomState,
+        dtype: DTypeLike = np.float64,
+    ) -> np.ndarray:
+        # draw the frequency factors and then the phase offsets of each line up front
+        u = rng.random_sample((m, 2, self.wave_count))
+        factors = (
+            self.freq_factor[0] + (self.freq_factor[1] - self.freq_factor[0]) * u[:, 0]
+        )
+        offset_min, offset_max = np.deg2rad(self.phase_offset_range)
+        offsets = offset_min + (offset_max - offset_min) * u[:, 1]
+        factors, offsets = factors.astype(dtype), offsets.astype(dtype)
+
+        # accumulate the product one wave at a time to avoid materialising an (m, wave_count, n) array
+        t = np.linspace(0, self.base_freq * 2 * np.pi, n, dtype=dtype)
+        res = np.ones((m, n), dtype=dtype)
+        for factor, offset in zip(factors.T, offsets.T):
+            res *= self.scale * np.sin(t * factor[:, None] + offset[:, None])
+
+        return res
+
+    def _skip(self, m: int, n: int, rng: np.random.RandomState) -> None:
+        rng.random_sample((m, 2, self.wave_count))
@@ -0,0 +1,101 @@
+__all__ = ['Stage', 'Profile']
+
+from typing import Iterable, Iterator, List, NamedTuple
+from contextlib import contextmanager
+import logging
+import time
+import tracemalloc
+
+logger = logging.getLogger('speck')
+
+
+class Stage(NamedTuple):
+    """
+    Measurements of one stage of a SpeckPlot.draw or SpeckPlot.save call
+    :param name: name of the stage, eg. 'noise', 'modifiers' for the lookup of cached modified lines,
+            'modifier[0] LineUnionModifier', or 'modifier[1:3] A+B' for LineModifiers A and B fused into one pass
+    :param time: wall time in seconds
+    :param hits: cache hits during the stage
+    :param misses: cache misses during the stage
+    :param nbytes: peak bytes allocated during the stage, as traced by tracemalloc
+    """
+
+    name: str
+    time: float
+    hits: int = 0
+    misses: int = 0
+    nbytes: int = 0
+
+
+class Profile:
+    def __init__(self, enabled: bool = True):
+        """
+        Per stage timing report, filled in by SpeckPlot.draw and SpeckPlot.save when called with profile=True.
+        Each stage is also logged at debug level to the 'speck' logger.
+        :param enabled: when False stages are not measured or recorded
+        """
+
+        self.enabled = enabled
+        self.stages: List[Stage] = []
+        self._tracing = False
+
+    def __enter__(self):
+        # memory tracing slows everything down, so only trace while profiling
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        return self
+
+    def __exit__(self, *args):
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    @contextmanager
+    def stage(self, name: str, cached: Iterable = ()) -> Iterator[None]:
+        """
+        Measure the enclosed block as a stage
+        :param name: name of the stage
+        :param cached: cached methods whose hits and misses are counted towards the stage
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        cached = list(cached)
+        before = [f.cache_info() for f in cached]
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+
+        yield
+
+        elapsed = time.perf_counter() - start
+        nbytes = max(tracemalloc.get_traced_memory()[1] - start_bytes, 0)
+        after = [f.cache_info() for f in cached]
+        hits = sum(a.hits - b.hits for a, b in zip(after, before))
+        misses = sum(a.misses - b.misses for a, b in zip(after, before))
+
+        stage = Stage(name, elapsed, hits, misses, nbytes)
+        self.stages.append(stage)
+        logger.debug('%s: %.4fs, %d hits, %d misses, %d bytes', *stage)
+
+    @property
+    def time(self) -> float:
+        return sum(s.time for s in self.stages)
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(stages={self.stages})'
+
+    def __str__(self):
+        width = max([len(s.name) for s in self.stages] + [5])
+        rows = [
+            f'{"stage":<{width}}  {"time (s)":>9}  {"hits":>5}  {"misses":>6}  {"peak (MB)":>9}'
+        ]
+        rows += [
+            f'{s.name:<{width}}  {s.time:>9.4f}  {s.hits:>5}  {s.misses:>6}  {s.nbytes / 2 ** 20:>9.2f}'
+            for s in self.stages
+        ]
+        rows.append(f'{"total":<{width}}  {self.time:>9.4f}')
+        return '\n'.join(rows)
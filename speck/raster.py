@@ -0,0 +1,161 @@
+__all__ = ['rasterize', 'to_image', 'PNGWriter']
+
+from typing import Union, Tuple, Optional, BinaryIO
+from itertools import cycle, repeat
+import struct
+import zlib
+
+import numpy as np
+from numpy.typing import DTypeLike
+import matplotlib as mpl
+from PIL import Image
+
+from speck.colour import rgba_array
+from speck.types import XData, LineXData, YData, NoiseData, ColourData
+
+
+def rasterize(
+    x: Union[XData, LineXData],
+    y: YData,
+    n: NoiseData,
+    c: ColourData,
+    shape: Tuple[int, int],
+    scale: float,
+    dtype: DTypeLike = np.float64,
+    layer: Optional[np.ndarray] = None,
+    offset: int = 0,
+) -> np.ndarray:
+    """
+    Scan-convert each line directly into a premultiplied RGBA buffer, without matplotlib.
+    Lines are composited in order, antialiased by the coverage of each pixel in every column.
+    :param x: x values shared by every line, or the x values of each line
+    :param y: (y_top, y_bot) for each line
+    :param n: (noise_top, noise_bot) added to each line, cycled
+    :param c: line colours, cycled
+    :param shape: (rows, columns) of the output buffer in pixels
+    :param scale: number of output pixels per unit of x and y
+    :param dtype: float dtype of the buffer
+    :param layer: existing buffer to composite the lines onto, instead of a new buffer of shape
+    :param offset: pixel row that the first row of the buffer corresponds to, to render a band of rows
+    :return: float array of shape (rows, columns, 4)
+    """
+
+    if layer is None:
+        layer = np.zeros(shape + (4,), dtype=dtype)
+    height, width = layer.shape[:2]
+
+    # x values of the centre of each output column
+    px = (np.arange(width) + 0.5) / scale
+
+    xs = x if isinstance(x, list) else repeat(x)
+    for x_, y_, n_, rgba in zip(xs, y, cycle(n), rgba_array(c, len(y))):
+        top = np.interp(px, x_, y_[0] + n_[0]) * scale - offset
+        bot = np.interp(px, x_, y_[1] + n_[1]) * scale - offset
+        lo = np.minimum(top, bot)
+        hi = np.maximum(top, bot)
+
+        # only touch the band of rows that the line covers
+        r0 = max(int(np.floor(lo.min())), 0)
+        r1 = min(int(np.ceil(hi.max())), height)
+        if r1 <= r0:
+            continue
+
+        r = np.arange(r0, r1)[:, None]
+        coverage = np.clip(np.minimum(hi, r + 1) - np.maximum(lo, r), 0, 1)
+
+        alpha = (coverage * rgba[3])[..., None]
+        layer[r0:r1] = layer[r0:r1] * (1 - alpha) + alpha * (*rgba[:3], 1)
+
+    return layer
+
+
+def to_image(
+    layer: np.ndarray, background: Optional[Union[str, Tuple[float, ...]]] = None
+) -> Image:
+    """
+    Convert a premultiplied RGBA buffer from rasterize to a PIL Image
+    :param layer: premultiplied RGBA buffer
+    :param background: colour to composite the buffer over, or None to keep it transparent
+    :return: RGBA PIL Image
+    """
+
+    return Image.fromarray(to_rgba8(layer, background))
+
+
+def to_rgba8(
+    layer: np.ndarray, background: Optional[Union[str, Tuple[float, ...]]] = None
+) -> np.ndarray:
+    # composite a premultiplied RGBA buffer over background and convert it to 8 bit straight RGBA
+
+    if background is not None:
+        bg = mpl.colors.to_rgba(background)
+        layer = layer + (1 - layer[..., 3:]) * (*np.multiply(bg[:3], bg[3]), bg[3])
+
+    if background is None or bg[3] < 1:
+        # un-premultiply, where the background is opaque alpha is 1 everywhere so this is skipped
+        alpha = layer[..., 3:]
+        rgb = np.divide(
+            layer[..., :3], alpha, out=np.zeros_like(layer[..., :3]), where=alpha > 0
+        )
+        layer = np.concatenate([rgb, alpha], axis=-1)
+
+    np.clip(layer, 0, 1, out=layer)
+    layer *= 255
+    return np.rint(layer, out=layer).astype(np.uint8)
+
+
+class PNGWriter:
+    def __init__(self, path: Union[str, BinaryIO], width: int, height: int):
+        """
+        Write an 8 bit RGBA png a band of rows at a time, without holding the whole image in memory
+        :param path: path to save location, or a binary file object
+        :param width: image width in pixels
+        :param height: image height in pixels
+        """
+
+        self.width = width
+        self.height = height
+        self.rows = 0
+        self._file = open(path, 'wb') if isinstance(path, str) else path
+        self._close_file = isinstance(path, str)
+        self._compressor = zlib.compressobj()
+
+        self._file.write(b'\x89PNG\r\n\x1a\n')
+        # 8 bit depth, RGBA colour type, default compression, filter and no interlace
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, *args):
+        if kind is None:
+            self.close()
+        elif self._close_file:
+            self._file.close()
+
+    def _chunk(self, kind: bytes, data: bytes) -> None:
+        self._file.write(struct.pack('>I', len(data)) + kind + data)
+        self._file.write(struct.pack('>I', zlib.crc32(kind + data)))
+
+    def write(self, rows: np.ndarray) -> None:
+        """
+        Append rows to the image
+        :param rows: uint8 array of shape (rows, width, 4)
+        """
+
+        # each row is prefixed with filter type 0 (none)
+        scanlines = np.zeros((len(rows), self.width * 4 + 1), dtype=np.uint8)
+        scanlines[:, 1:] = rows.reshape(len(rows), self.width * 4)
+        data = self._compressor.compress(scanlines.tobytes())
+        if data:
+            self._chunk(b'IDAT', data)
+        self.rows += len(rows)
+
+    def close(self) -> None:
+        if self.rows != self.height:
+            raise AssertionError(f'Wrote {self.rows} of {self.height} rows')
+
+        self._chunk(b'IDAT', self._compressor.flush())
+        self._chunk(b'IEND', b'')
+        if self._close_file:
+            self._file.close()
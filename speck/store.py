@@ -0,0 +1,204 @@
+__all__ = ['digest', 'MemmapStore', 'DiskCache']
+
+from typing import Any, Callable, Tuple, List
+import hashlib
+import os
+import types
+import uuid
+import zipfile
+
+import numpy as np
+from numpy.typing import DTypeLike
+
+from speck.cache import CacheInfo
+
+# part of every digest, bumped whenever the hashing or the arrays stored under a key change, so that files written
+# by an older version are never read back. Version 1 keys hashed objects by repr, which abbreviates long arrays,
+# and were written with a different noise stream
+_KEY_VERSION = 2
+
+
+def digest(*parts: Any) -> str:
+    """
+    Hex digest of parts that is stable across processes, unlike hash() which is salted per process for strings.
+    Arrays are hashed by dtype, shape and contents, lists, tuples and dicts by their items, and other objects
+    (eg. Noise) by their class and public attributes, recursively. Builtin scalars are hashed by repr.
+    """
+
+    h = hashlib.sha1(f'speck-{_KEY_VERSION}'.encode())
+    for p in parts:
+        _update(h, p)
+
+    return h.hexdigest()
+
+
+# objects with a __dict__ that isn't what they are defined by
+_NOT_WALKED = (type, types.FunctionType, types.MethodType, types.ModuleType)
+
+
+def _update(h: 'hashlib._Hash', p: Any) -> None:
+    if isinstance(p, np.ndarray):
+        h.update(f'ndarray{p.dtype.str}{p.shape}'.encode())
+        h.update(np.ascontiguousarray(p).tobytes())
+    elif isinstance(p, (list, tuple)):
+        h.update(f'{type(p).__name__}{len(p)}'.encode())
+        for i in p:
+            _update(h, i)
+    elif isinstance(p, dict):
+        h.update(f'dict{len(p)}'.encode())
+        for k, v in p.items():
+            _update(h, k)
+            _update(h, v)
+    elif hasattr(p, '__dict__') and not isinstance(p, _NOT_WALKED):
+        # like the hash of Noise, Colour and Modifier objects, attributes with a leading _ are left out
+        h.update(f'{type(p).__module__}.{type(p).__qualname__}'.encode())
+        attributes = {k: v for k, v in vars(p).items() if not k.startswith('_')}
+        _update(h, attributes)
+    else:
+        h.update(repr(p).encode())
+    h.update(b'\0')
+
+
+class MemmapStore:
+    def __init__(self, directory: str, band: int = 64):
+        """
+        Arrays stored as .npy files in a scratch directory and read back memory-mapped, so that arrays larger than
+        RAM are paged in from disk as they are read. Files are named by key, so any process using the same
+        directory reuses an array that another process has already generated.
+        :param directory: scratch directory, created if it doesn't exist
+        :param band: number of rows (along axis 1) generated at a time
+        """
+
+        self.directory = directory
+        self.band = band
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npy')
+
+    def array(
+        self,
+        key: str,
+        shape: Tuple[int, ...],
+        dtype: DTypeLike,
+        fill: Callable[[slice], np.ndarray],
+    ) -> np.memmap:
+        """
+        Read only memory-mapped array stored under key, generated first if it isn't stored yet
+        :param key: name of the array, eg. from digest of everything the array depends on
+        :param shape: shape of the array, with rows along axis 1
+        :param dtype: dtype of the array
+        :param fill: called with a slice of rows, returns the array's values for those rows
+        :return: read only np.memmap of the array
+        """
+
+        path = self.path(key)
+        if not os.path.exists(path):
+            # generate into a file of our own, then move it into place so other processes only see whole arrays
+            tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+            try:
+                out = np.lib.format.open_memmap(tmp, 'w+', dtype, shape)
+                for start in range(0, shape[1], self.band):
+                    rows = slice(start, min(start + self.band, shape[1]))
+                    out[:, rows] = fill(rows)
+                out.flush()
+                del out
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+        return np.load(path, mmap_mode='r')
+
+
+class DiskCache:
+    def __init__(self, directory: str, max_bytes: int = 2**32):
+        """
+        Persistent cache of arrays as compressed .npz files, shared by every process using the same directory,
+        so restarts and other processes skip recomputing them.
+        Least recently used files are deleted to keep the total size of the directory under max_bytes.
+        :param directory: cache directory, created if it doesn't exist
+        :param max_bytes: disk budget in bytes
+        """
+
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key: str, compute: Callable[[], np.ndarray]) -> np.ndarray:
+        """
+        Array stored under key, computed and stored first if it isn't stored yet
+        :param key: name of the array, eg. from digest of everything the array depends on
+        :param compute: called to compute the array on a miss
+        """
+
+        path = self.path(key)
+        try:
+            with np.load(path) as f:
+                array = f['array']
+        except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile):
+            # missing, deleted by another process, or unreadable
+            array = None
+
+        if array is not None:
+            try:
+                # the modification time orders files by last use for eviction
+                os.utime(path)
+            except OSError:
+                pass
+            self.hits += 1
+            return array
+
+        self.misses += 1
+        array = compute()
+        tmp = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez_compressed(f, array=array)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        self.evict()
+        return array
+
+    def _files(self) -> List[Tuple[float, int, str]]:
+        # (last use, size, path) of every cached array
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.npz'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def info(self) -> CacheInfo:
+        sizes = [size for _, size, _ in self._files()]
+        return CacheInfo(self.hits, self.misses, self.max_bytes, len(sizes), sum(sizes))
+
+    def evict(self) -> None:
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self) -> None:
+        for _, _, path in self._files():
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -1,10 +1,25 @@
-__all__ = ['XData', 'YData', 'NoiseData', 'ColourData']
+__all__ = [
+    'XData',
+    'LineXData',
+    'YData',
+    'YArray',
+    'NoiseData',
+    'NoiseArray',
+    'ColourData',
+]
 
 from typing import Union, Iterable, List, Tuple
 
 import numpy as np
 
 XData = np.ndarray
+# x values of each line, for lines that are sampled independently
+LineXData = List[np.ndarray]
 YData = List[Tuple[np.ndarray, np.ndarray]]
+# shape (2, lines, points): stacked y_top and y_bot of every line
+YArray = np.ndarray
 NoiseData = List[Tuple[Union[np.ndarray, int], Union[np.ndarray, int]]]
-ColourData = Union[Iterable, Iterable[Tuple]]
+# shape (2, lines, points): stacked top and bottom noise of every line
+NoiseArray = np.ndarray
+# colours of each line, either an (lines, 4) RGBA array or an iterable of matplotlib colours
+ColourData = Union[np.ndarray, Iterable, Iterable[Tuple]]
@@ -0,0 +1,243 @@
+__all__ = ['simplify', 'outlines', 'write_svg', 'write_pdf']
+
+from typing import Union, Tuple, Iterator, Iterable, Optional, List
+from itertools import cycle, repeat, islice
+import zlib
+
+import numpy as np
+import matplotlib as mpl
+
+from speck.types import XData, LineXData, YData, NoiseData
+
+
+def simplify(
+    x: np.ndarray, y: np.ndarray, starts: np.ndarray, tolerance: float
+) -> np.ndarray:
+    """
+    Ramer-Douglas-Peucker simplification of many polylines at once, measuring the vertical distance to each chord
+    :param x: x values of every polyline, concatenated
+    :param y: y values of every polyline, concatenated
+    :param starts: index of the first point of each polyline
+    :param tolerance: maximum distance between the simplified and original polylines
+    :return: boolean mask of the points that are kept
+    """
+
+    points = len(x)
+    idx = np.arange(points)
+    keep = np.zeros(points, dtype=bool)
+    keep[starts] = True
+    keep[np.append(starts[1:], points) - 1] = True
+
+    # split every interval that strays from its chord by more than tolerance at its furthest point,
+    # all intervals at once, until every interval is within tolerance
+    while True:
+        prev = np.maximum.accumulate(np.where(keep, idx, 0))
+        next_ = np.minimum.accumulate(np.where(keep, idx, points - 1)[::-1])[::-1]
+
+        span = x[next_] - x[prev]
+        t = np.divide(x - x[prev], span, out=np.zeros(points), where=span != 0)
+        error = np.abs(y - y[prev] - t * (y[next_] - y[prev]))
+        far = np.flatnonzero(error > tolerance)
+        if not len(far):
+            return keep
+
+        # furthest point of each interval: sort by interval then by decreasing error and take the first of each
+        far = far[np.lexsort((-error[far], prev[far]))]
+        _, first = np.unique(prev[far], return_index=True)
+        keep[far[first]] = True
+
+
+def outlines(
+    x: Union[XData, LineXData],
+    y: YData,
+    n: NoiseData,
+    tolerance: Optional[float] = None,
+    band: int = 64,
+) -> Iterator[np.ndarray]:
+    """
+    Outline of each line, along the top edge and back along the bottom edge, simplified a band of lines at a time
+    :param x: x values shared by every line, or the x values of each line
+    :param y: (y_top, y_bot) for each line
+    :param n: (noise_top, noise_bot) added to each line, cycled
+    :param tolerance: maximum distance, in units of line spacing, between the simplified and original edges.
+            None keeps every point
+    :param band: number of lines simplified together
+    :return: iterator of (points, 2) arrays of (x, y) for each line
+    """
+
+    lines = zip(x if isinstance(x, list) else repeat(x), y, cycle(n))
+    while True:
+        chunk = list(islice(lines, band))
+        if not chunk:
+            return
+
+        # each line's top and bottom edge, concatenated
+        xs, ys, lengths = [], [], []
+        for x_, y_, n_ in chunk:
+            for edge in (y_[0] + n_[0], y_[1] + n_[1]):
+                xs.append(x_)
+                ys.append(np.broadcast_to(edge, x_.shape))
+                lengths.append(len(x_))
+        xs, ys = np.concatenate(xs), np.concatenate(ys)
+        bounds = np.cumsum([0] + lengths)
+
+        if tolerance is None:
+            keep = np.ones(len(xs), dtype=bool)
+        else:
+            keep = simplify(xs, ys, bounds[:-1], tolerance)
+
+        for i in range(0, len(lengths), 2):
+            top = slice(bounds[i], bounds[i + 1])
+            bot = slice(bounds[i + 1], bounds[i + 2])
+            yield np.concatenate(
+                [
+                    np.stack([xs[top][keep[top]], ys[top][keep[top]]], axis=1),
+                    np.stack([xs[bot][keep[bot]], ys[bot][keep[bot]]], axis=1)[::-1],
+                ]
+            )
+
+
+def _hex(rgba: Iterable[float]) -> str:
+    return mpl.colors.to_hex(rgba, keep_alpha=False)
+
+
+def write_svg(
+    path: str,
+    polygons: Iterable[np.ndarray],
+    colours: np.ndarray,
+    w: float,
+    h: float,
+    points_per_unit: float,
+    horizontal: bool = True,
+    background: Optional[Union[str, Tuple[float, ...]]] = None,
+) -> None:
+    """
+    Write filled polygons to an svg file as they are generated
+    :param path: path to save location
+    :param polygons: (points, 2) array of (x along the line, line position) for each line
+    :param colours: (lines, 4) RGBA array
+    :param w: length of the lines
+    :param h: number of line positions
+    :param points_per_unit: output size in points of one unit of x and y
+    :param horizontal: whether the lines are horizontal, vertical lines run up from the bottom
+    :param background: background colour, or None for a transparent background
+    """
+
+    # (width, height) in data units and the transform from (x along the line, line position) to svg coordinates
+    if horizontal:
+        size, transform = (w, h), ''
+    else:
+        size, transform = (h, w), f'matrix(0 -1 1 0 0 {w})'
+
+    with open(path, 'w') as f:
+        f.write(
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            f'<svg xmlns="http://www.w3.org/2000/svg" version="1.1" '
+            f'width="{size[0] * points_per_unit:g}pt" height="{size[1] * points_per_unit:g}pt" '
+            f'viewBox="0 0 {size[0]:g} {size[1]:g}">\n'
+        )
+        if background is not None:
+            rgba = mpl.colors.to_rgba(background)
+            f.write(
+                f'<rect width="{size[0]:g}" height="{size[1]:g}" fill="{_hex(rgba)}" '
+                f'fill-opacity="{rgba[3]:g}"/>\n'
+            )
+
+        f.write(f'<g transform="{transform}">\n' if transform else '<g>\n')
+        for polygon, rgba in zip(polygons, colours):
+            points = ' '.join(map('{:.3f},{:.3f}'.format, *polygon.T.tolist()))
+            opacity = f' fill-opacity="{rgba[3]:g}"' if rgba[3] < 1 else ''
+            f.write(f'<path d="M{points}Z" fill="{_hex(rgba)}"{opacity}/>\n')
+        f.write('</g>\n</svg>\n')
+
+
+def write_pdf(
+    path: str,
+    polygons: Iterable[np.ndarray],
+    colours: np.ndarray,
+    w: float,
+    h: float,
+    points_per_unit: float,
+    horizontal: bool = True,
+    background: Optional[Union[str, Tuple[float, ...]]] = None,
+) -> None:
+    """
+    Write filled polygons to a single page pdf file as they are generated, into a compressed content stream
+    :param path: path to save location
+    :param polygons: (points, 2) array of (x along the line, line position) for each line
+    :param colours: (lines, 4) RGBA array
+    :param w: length of the lines
+    :param h: number of line positions
+    :param points_per_unit: output size in points of one unit of x and y
+    :param horizontal: whether the lines are horizontal, vertical lines run up from the bottom
+    :param background: background colour, or None for a transparent background
+    """
+
+    s = points_per_unit
+    if horizontal:
+        width, height = w * s, h * s
+        # pdf y runs up from the bottom, line positions run down from the top
+        transform = f'{s:g} 0 0 {-s:g} 0 {height:g} cm'
+    else:
+        width, height = h * s, w * s
+        transform = f'0 {s:g} {s:g} 0 0 0 cm'
+
+    with open(path, 'wb') as f:
+        offsets = {}
+
+        def start(obj: int) -> None:
+            offsets[obj] = f.tell()
+            f.write(f'{obj} 0 obj\n'.encode())
+
+        f.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+        # content stream, its length is only known once it has been written so it's a separate object
+        start(4)
+        f.write(b'<< /Length 5 0 R /Filter /FlateDecode >>\nstream\n')
+        stream_start = f.tell()
+        compressor = zlib.compressobj()
+        alphas: List[float] = []
+
+        def fill(rgba: Tuple[float, ...], ops: str) -> None:
+            if rgba[3] not in alphas:
+                alphas.append(rgba[3])
+            state = f'/a{alphas.index(rgba[3])} gs {rgba[0]:.4f} {rgba[1]:.4f} {rgba[2]:.4f} rg\n'
+            f.write(compressor.compress((state + ops).encode()))
+
+        f.write(compressor.compress(f'{transform}\n'.encode()))
+        if background is not None:
+            fill(mpl.colors.to_rgba(background), f'0 0 {w:g} {h:g} re f\n')
+        for polygon, rgba in zip(polygons, colours):
+            x, y = polygon.T.tolist()
+            ops = ' l\n'.join(map('{:.3f} {:.3f}'.format, x, y))
+            fill(tuple(rgba), ops.replace(' l\n', ' m\n', 1) + ' l h f\n')
+        f.write(compressor.flush())
+        length = f.tell() - stream_start
+        f.write(b'\nendstream\nendobj\n')
+
+        start(5)
+        f.write(f'{length}\nendobj\n'.encode())
+
+        # one graphics state per distinct alpha
+        states = ' '.join(f'/a{i} {6 + i} 0 R' for i in range(len(alphas)))
+        for i, alpha in enumerate(alphas):
+            start(6 + i)
+            f.write(f'<< /Type /ExtGState /ca {alpha:g} >>\nendobj\n'.encode())
+
+        start(1)
+        f.write(b'<< /Type /Catalog /Pages 2 0 R >>\nendobj\n')
+        start(2)
+        f.write(b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n')
+        start(3)
+        f.write(
+            f'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {width:g} {height:g}] /Contents 4 0 R '
+            f'/Resources << /ExtGState << {states} >> >> >>\nendobj\n'.encode()
+        )
+
+        xref = f.tell()
+        f.write(f'xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n'.encode())
+        for obj in sorted(offsets):
+            f.write(f'{offsets[obj]:010d} 00000 n \n'.encode())
+        f.write(
+            f'trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n'.encode()
+        )
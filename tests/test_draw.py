@@ -1,10 +1,33 @@
 import os
+import subprocess
+import sys
+import tracemalloc
+from functools import partial
+from io import BytesIO
 
+import numpy as np
 import pytest
+from PIL import Image
 
 from speck.draw import SpeckPlot
-from speck.noise import SineNoise
-from speck.colour import GradientColour, CmapColour
+from speck.batch import Job, render_many
+from speck.animate import FrameWriter
+from speck.noise import SineNoise, RandomNoise
+from speck.colour import (
+    Colour,
+    GradientColour,
+    CmapColour,
+    KMeansColour,
+    GreyscaleMeanColour,
+)
+from speck.modifier import (
+    AdaptiveSampleModifier,
+    LineUnionModifier,
+    LineModifier,
+    ModifierPipeline,
+)
+from speck.vector import simplify
+from speck.store import DiskCache, digest
 
 try:
     import argument_randomiser as ar
@@ -119,3 +142,623 @@ def test_sine_colour_cmap(speck_plot, sine_noise_cls, colour_cmap_cls, seed):
         background=ar.SelectionRandomiser(COLOURS, seed=x()),
         seed=x(),
     )
+
+
+@pytest.mark.parametrize('horizontal', [True, False])
+def test_raster_backend_size(horizontal):
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50, horizontal=horizontal)
+    image = s.draw(noise=SineNoise(), colour='red', seed=1, backend='raster')
+
+    assert image.size == (s.image.size[0] * 3, s.image.size[1] * 3)
+
+
+@pytest.mark.parametrize('horizontal', [True, False])
+def test_raster_backend_matches_matplotlib(horizontal):
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50, horizontal=horizontal)
+    params = dict(noise=SineNoise(), colour=GradientColour(['red', 'blue']), seed=1)
+    raster = np.asarray(s.draw(backend='raster', **params).convert('RGB'), float)
+
+    s.draw(**params)
+    buffer = BytesIO()
+    s.save(buffer)
+    figure = np.asarray(Image.open(buffer).convert('RGB'), float)
+
+    # only antialiasing differs, wrong geometry or colours differ by 10 or more
+    assert raster.shape == figure.shape
+    assert np.abs(raster - figure).mean() < 3
+
+
+@pytest.mark.parametrize('transparent', [False, True])
+def test_draw_tiled_matches_raster(tmp_path, transparent):
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    params = dict(noise=SineNoise(), colour=GradientColour(['red', 'blue']), seed=1)
+    s.draw(backend='raster', **params)
+    s.save(str(tmp_path / 'full.png'), transparent)
+    s.draw_tiled(str(tmp_path / 'tiled.png'), transparent=transparent, band=4, **params)
+
+    full = np.asarray(Image.open(tmp_path / 'full.png'))
+    tiled = np.asarray(Image.open(tmp_path / 'tiled.png'))
+    assert np.array_equal(full, tiled)
+
+
+@pytest.mark.parametrize('noise_cls', [SineNoise, RandomNoise])
+def test_noise_seed_independent_of_line_order(noise_cls):
+    noise = noise_cls('independent')
+    expected = noise.generate(6, 200, seed=1)
+
+    for i in reversed(range(6)):
+        line = noise.generate(6, 200, seed=1, lines=[i])
+        assert np.array_equal(line, expected[:, [i]])
+    assert np.array_equal(
+        noise.generate(6, 200, seed=1, lines=[4, 0, 1]), expected[:, [4, 0, 1]]
+    )
+
+
+def test_render_many():
+    jobs = [
+        Job(IMAGE_PATH, {'colour': c, 'backend': b}, upscale=3, resize=30)
+        for c in ('red', 'blue')
+        for b in ('matplotlib', 'raster')
+    ]
+    jobs.append(Job('missing.jpg'))
+
+    results = sorted(render_many(jobs, workers=2), key=lambda r: r.index)
+
+    assert [r.job for r in results] == jobs
+    assert all(r.output.startswith(b'\x89PNG') for r in results[:-1])
+    assert results[-1].output is None and 'missing.jpg' in results[-1].error
+
+
+def test_cache_byte_budget():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    s.draw(weights=(0, 1))
+    y_bytes = s.cache_info()['y_array'].nbytes
+
+    s.set_max_cache_bytes(int(1.5 * y_bytes))
+    s.draw(weights=(0.2, 0.8))
+
+    assert s.cache_info()['y_array'].currsize == 1
+    assert s._cache.nbytes <= 1.5 * y_bytes
+
+
+def test_float32_geometry():
+    s64 = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    s32 = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50, dtype=np.float32)
+    y64 = s64._y_array((0.2, 0.8), (0, 1), 0)
+    y32 = s32._y_array((0.2, 0.8), (0, 1), 0)
+    n32 = SineNoise().generate(s32.h, s32.w * s32.inter, seed=1, dtype=np.float32)
+
+    assert y32.dtype == n32.dtype == np.float32
+    assert np.allclose(y32, y64, atol=1e-4)
+
+
+def test_adaptive_sample_modifier():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    x, y, n = s._x(), s._y((0.2, 0.8), (0, 1), 0), s._noise(SineNoise(), 1)
+    x_, y_, n_, _ = AdaptiveSampleModifier(0.01)(x, y, n, ['black'])
+
+    assert sum(map(len, x_)) < len(x) * len(y) / 2
+    for xl, (top, bot), (top_, bot_), (n_top, n_bot) in zip(x_, y, y_, n):
+        assert np.abs(np.interp(x, xl, top_) - (top + n_top)).max() <= 0.01
+        assert np.abs(np.interp(x, xl, bot_) - (bot + n_bot)).max() <= 0.01
+
+    # lines are refined in bands, which doesn't change the result
+    modifier = AdaptiveSampleModifier(0.01)
+    modifier.band = 3
+    x_3, y_3, _, _ = modifier(x, y, n, ['black'])
+    assert all(np.array_equal(a, b) for a, b in zip(x_3, x_))
+    assert all(np.array_equal(a[0], b[0]) for a, b in zip(y_3, y_))
+
+
+def test_recolour_reuses_collection():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    s.draw(noise=SineNoise(), colour='red', seed=1)
+    collection = s._collection
+    assert list(s.ax.collections) == [collection]
+    assert len(collection.get_paths()) == s.h
+
+    s.draw(noise=SineNoise(), colour='blue', background='black', seed=1)
+    assert s._collection is collection
+    assert tuple(collection.get_facecolor()[0]) == (0.0, 0.0, 1.0, 1.0)
+
+    s.draw(noise=SineNoise(), colour='blue', seed=2)
+    assert s._collection is not collection
+
+
+def test_kmeans_colour_fast():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=200)
+    colours = np.array(KMeansColour(s)(s.h))
+    fast_colours = np.array(KMeansColour(s, fast=True)(s.h))
+    skip_colours = np.array(KMeansColour(s, fast=True)(s.h, skip=2))
+
+    assert fast_colours.shape == colours.shape
+    assert np.median(np.abs(fast_colours - colours)) < 0.01
+    assert len(skip_colours) == len(colours[::3])
+
+
+def test_colour_rgba_arrays():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    for colour in (
+        GradientColour(['red', 'blue']),
+        KMeansColour(s, fast=True),
+        GreyscaleMeanColour(s),
+    ):
+        c = colour(s.h)
+        assert isinstance(c, np.ndarray) and c.shape == (s.h, 4)
+
+
+class AlternatingColour(Colour):
+    def __init__(self, colours):
+        self.colours = colours
+
+    def __call__(self, m):
+        return [self.colours[i % len(self.colours)] for i in range(m)]
+
+
+class StoredColour(Colour):
+    def __init__(self, colours):
+        self._colours = colours
+
+    def __call__(self, m):
+        return self._colours
+
+
+def test_cached_colour_is_read_only_view():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=30)
+    colours = np.ones((s.h, 4))
+    c = s._colour(StoredColour(colours), 0)
+    assert not c.flags.writeable
+    assert colours.flags.writeable
+
+
+@pytest.mark.parametrize('backend', ['matplotlib', 'raster'])
+def test_custom_colour(backend):
+    # colours that don't opt in to supports_skip are called with the number of rows only, as before
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=30)
+    s.draw(colour=AlternatingColour(['red', 'blue']), skip=1, backend=backend)
+    assert list(s._lines[3][0]) == [1, 0, 0, 1]
+    assert list(s._lines[3][1]) == [0, 0, 1, 1]
+
+
+def test_draw_profile():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=30)
+    modifiers = [
+        LineUnionModifier([2] * (s.h // 2)),
+        ShiftModifier(1),
+        ShiftModifier(2),
+        AdaptiveSampleModifier(),
+    ]
+    s.draw(noise=SineNoise(), modifiers=modifiers, profile=True)
+    names = [stage.name for stage in s.last_profile.stages]
+    assert names == [
+        'x',
+        'y',
+        'noise',
+        'colour',
+        'modifiers',
+        'modifier[0] LineUnionModifier',
+        'modifier[1:3] ShiftModifier+ShiftModifier',
+        'modifier[3] AdaptiveSampleModifier',
+        'polygons',
+    ]
+    assert s.last_profile.stages[2].misses == 1
+
+    assert s.last_profile.stages[4].misses == 1
+
+    # modified lines from the cache are a single stage
+    s.draw(noise=SineNoise(), background='blue', modifiers=modifiers, profile=True)
+    assert [stage.name for stage in s.last_profile.stages][4:] == [
+        'modifiers',
+        'recolour',
+    ]
+    assert s.last_profile.stages[4].hits == 1
+
+    s.draw(noise=SineNoise(), backend='raster', profile=True)
+    assert s.last_profile.stages[2].hits == 1
+    assert s.last_profile.time > 0
+
+
+def test_import_is_lazy():
+    # heavy optional dependencies are only imported on first use
+    code = (
+        'import sys, speck; '
+        'print([m for m in ("ipywidgets", "cv2", "matplotlib.pyplot") if m in sys.modules])'
+    )
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert out.stdout.strip() == '[]'
+
+
+@pytest.mark.parametrize(
+    'aggregation',
+    [
+        'sum',
+        'mean',
+        lambda a: np.max(a, axis=0),
+        # custom aggregations are passed a list
+        lambda a: np.max(a + a[:1], axis=0),
+    ],
+)
+def test_line_union_modifier(aggregation):
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=90)
+    y = s._y((0.2, 0.9), (0, 1), 0)
+    thicknesses = [1, 2, 2, 3, 3, 1]
+    thicknesses += [2] * ((s.h - 12) // 2) + [1] * ((s.h - 12) % 2)
+    _, y_, _, _ = LineUnionModifier(thicknesses, aggregation)(s._x(), y, [(0, 0)], [])
+
+    func = {'sum': partial(np.sum, axis=0), 'mean': partial(np.mean, axis=0)}
+    func = func.get(aggregation, aggregation)
+    pos = 0
+    for t, line in zip(thicknesses, y_):
+        for k in range(2):
+            expected = func([y[pos + i][k] - pos - i - 0.5 for i in range(t)])
+            assert np.allclose(line[k], expected + pos + t / 2)
+        pos += t
+    assert len(y_) == len(thicknesses)
+
+
+class ShiftModifier(LineModifier):
+    def __init__(self, shift):
+        self.shift = shift
+
+    def modify_line(self, x, y, n):
+        return x, (y[0] + self.shift, y[1] + self.shift), n
+
+
+def test_modifier_pipeline():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=30)
+    x, y = s._x(), s._y((0.2, 0.9), (0, 1), 0)
+    modifiers = [ShiftModifier(1), ShiftModifier(2), AdaptiveSampleModifier()]
+
+    # consecutive line modifiers are fused, with the same result as applying them one after another
+    expected = x, y, [(0, 0)], ['red']
+    for m in modifiers:
+        expected = m(*expected)
+    x_, y_, n_, c_ = ModifierPipeline(modifiers)(x, y, [(0, 0)], ['red'])
+    assert all(np.array_equal(a, b) for a, b in zip(x_, expected[0]))
+    assert all(np.array_equal(a[0], b[0]) for a, b in zip(y_, expected[1]))
+
+    # x is still shared by every line after the fused modifiers
+    assert ModifierPipeline(modifiers[:2])(x, y, [(0, 0)], ['red'])[0] is x
+
+    # redrawing with an equal chain of modifiers reuses the cached output
+    s.draw(modifiers=modifiers)
+    s.draw(modifiers=[ShiftModifier(1), ShiftModifier(2), AdaptiveSampleModifier()])
+    assert s.cache_info()['modified'].hits == 1
+    s.draw(modifiers=[ShiftModifier(1), ShiftModifier(3), AdaptiveSampleModifier()])
+    assert s.cache_info()['modified'].misses == 2
+
+
+class OptionsModifier(LineModifier):
+    def __init__(self, options):
+        self.options = options
+
+    def modify_line(self, x, y, n):
+        return x, (y[0] + self.options['shift'], y[1] + self.options['shift']), n
+
+
+@pytest.mark.parametrize('backend', ['matplotlib', 'raster'])
+def test_unhashable_modifier(backend):
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=30)
+    options = {'shift': 1}
+    image = s.draw(modifiers=[OptionsModifier(options)], backend=backend)
+    y = s._lines[1]
+    assert OptionsModifier({'shift': 1}) == OptionsModifier(options)
+    assert OptionsModifier({'shift': 2}) != OptionsModifier(options)
+
+    # unhashable parameters can be changed in place, so every draw with them is computed again
+    options['shift'] = 2
+    image_ = s.draw(modifiers=[OptionsModifier(options)], backend=backend)
+    assert s.cache_info()['modified'].hits == 0
+    assert np.array_equal(s._lines[1][0][0], y[0][0] + 1)
+    if backend == 'raster':
+        assert image_.tobytes() != image.tobytes()
+
+
+def test_modifiers_use_drawn_lines():
+    # geometry larger than the byte budget isn't cached, so it must only be generated once per draw
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    s.set_max_cache_bytes(100000)
+    thicknesses = [1] * (s.h % 2) + [2] * (s.h // 2)
+    s.draw(noise=SineNoise(), modifiers=[LineUnionModifier(thicknesses)])
+    assert s.cache_info()['y_array'].misses == 1
+    assert s.cache_info()['noise'].misses == 1
+    assert s.cache_info()['modified'].misses == 1
+
+
+def test_draw_memoized():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=30)
+    params = dict(noise=SineNoise(), modifiers=[LineUnionModifier([2] * (s.h // 2))])
+    image = s.draw(colour=KMeansColour(s), backend='raster', **params)
+
+    # equal parameters, even as new objects, skip all computation
+    image_ = s.draw(colour=KMeansColour(s), backend='raster', profile=True, **params)
+    assert image_.tobytes() == image.tobytes()
+    assert 'rasterize' not in [stage.name for stage in s.last_profile.stages]
+    assert s.cache_info()['colour'].misses == 1
+    assert s.cache_info()['modified'].hits == 1
+
+    # every caller gets its own image and the cached colours are read only
+    image_.paste((1, 2, 3), (0, 0, *image_.size))
+    assert s.draw(colour=KMeansColour(s), backend='raster', **params) == image
+    assert not s._colour(KMeansColour(s), 0).flags.writeable
+
+    assert s.draw(colour='red', backend='raster', **params) != image
+
+
+class ListWriter(FrameWriter):
+    def __init__(self):
+        self.frames = []
+        self.closed = False
+
+    def write(self, image):
+        self.frames.append(np.asarray(image))
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_animate(tmp_path, workers):
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=30)
+    schedule = [
+        {'noise': SineNoise(phase_offset_range=(a, a + 360))} for a in range(0, 90, 30)
+    ] + [{'weights': (0.2, 0.5)}]
+    writer = ListWriter()
+    assert s.animate(schedule, writer, workers, weights=(0.2, 0.9), seed=1) == 4
+    assert writer.closed
+
+    for frame, params in zip(writer.frames, schedule):
+        expected = s.draw(
+            **{'weights': (0.2, 0.9), 'seed': 1, **params}, backend='raster'
+        )
+        assert np.array_equal(frame, np.asarray(expected))
+
+    s.animate(schedule, str(tmp_path / '{:02d}.png'), workers)
+    assert sorted(os.listdir(tmp_path)) == ['00.png', '01.png', '02.png', '03.png']
+
+
+@pytest.mark.parametrize('horizontal', [True, False])
+def test_save_vector(tmp_path, horizontal):
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50, horizontal=horizontal)
+    s.draw(noise=SineNoise(), colour='red', seed=1, backend='raster')
+    s.save(str(tmp_path / 'exact.svg'), tolerance=None)
+    s.save(str(tmp_path / 'simple.svg'))
+    s.save(str(tmp_path / 'simple.pdf'))
+
+    exact = (tmp_path / 'exact.svg').read_text()
+    simple = (tmp_path / 'simple.svg').read_text()
+    assert exact.count('<path') == simple.count('<path') == s.h
+    assert len(simple) < len(exact) / 2
+    assert (tmp_path / 'simple.pdf').read_bytes().startswith(b'%PDF')
+
+
+def test_simplify():
+    x = np.linspace(0, 1, 101)
+    y = np.concatenate([np.abs(x - 0.5), np.sin(6 * x)])
+    keep = simplify(np.tile(x, 2), y, np.array([0, 101]), 0.01)
+
+    assert np.flatnonzero(keep[:101]).tolist() == [0, 50, 100]
+    assert keep[101] and keep[-1]
+    assert (
+        np.abs(np.interp(x, x[keep[101:]], y[101:][keep[101:]]) - y[101:]).max() <= 0.01
+    )
+
+
+def test_set_k_keeps_noise_cache():
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    s.draw(noise=SineNoise(), seed=1, backend='raster')
+    s.set_k(4)
+    s.draw(noise=SineNoise(), seed=1, backend='raster')
+
+    info = s.cache_info()
+    assert info['noise'].hits == 1 and info['kernel'].misses == 1
+
+    fresh = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    fresh.set_k(4)
+    y = fresh._y_array((0.2, 0.9), (0, 1), 0)
+    assert np.array_equal(s._y_array((0.2, 0.9), (0, 1), 0), y)
+
+
+def test_scratch_dir(tmp_path):
+    params = dict(noise=SineNoise(), colour='red', seed=1, backend='raster')
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    expected = np.asarray(s.draw(**params))
+
+    s.set_scratch_dir(str(tmp_path))
+    assert np.array_equal(np.asarray(s.draw(**params)), expected)
+    files = sorted(os.listdir(tmp_path))
+    assert len(files) == 2
+    assert s.cache_info()['y_array'].nbytes == s.cache_info()['noise'].nbytes == 0
+
+    # another plot of the same image maps the files that are already there
+    other = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    other.set_scratch_dir(str(tmp_path))
+    assert np.array_equal(np.asarray(other.draw(**params)), expected)
+    assert sorted(os.listdir(tmp_path)) == files
+    assert isinstance(other._y_array((0, 1), (0, 1), 0), np.memmap)
+
+
+def test_disk_cache(tmp_path):
+    params = dict(noise=SineNoise(), colour='red', seed=1, backend='raster')
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    s.set_disk_cache(str(tmp_path))
+    expected = np.asarray(s.draw(**params))
+    assert s.cache_info()['disk'].misses == 2
+
+    # a new plot of the same image, as in a new process, loads the geometry and noise instead of generating them
+    restarted = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    restarted.set_disk_cache(str(tmp_path))
+    assert np.array_equal(np.asarray(restarted.draw(**params)), expected)
+    assert restarted.cache_info()['disk'][:2] == (2, 0)
+
+    restarted.draw(**{**params, 'seed': 2})
+    assert restarted.cache_info()['disk'].misses == 1
+
+
+def test_disk_cache_key_version(tmp_path, monkeypatch):
+    params = dict(noise=SineNoise(), seed=1, backend='raster')
+    s = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    s.set_disk_cache(str(tmp_path))
+    s.draw(**params)
+
+    # files written under keys of another version are never read back
+    monkeypatch.setattr('speck.store._KEY_VERSION', 1)
+    restarted = SpeckPlot.from_path(IMAGE_PATH, upscale=3, resize=50)
+    restarted.set_disk_cache(str(tmp_path))
+    restarted.draw(**params)
+    assert restarted.cache_info()['disk'][:2] == (0, 2)
+
+
+def test_disk_cache_eviction(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    arrays = [np.random.default_rng(i).random(500) for i in range(4)]
+    cache.get('0', lambda: arrays[0])
+    cache.max_bytes = int(cache.info().nbytes * 3.5)
+
+    for i in range(1, 3):
+        cache.get(str(i), lambda: arrays[i])
+    # make 0 and 1 the oldest, then read 0 so that 1 is the least recently used
+    os.utime(cache.path('0'), (0, 1))
+    os.utime(cache.path('1'), (0, 0))
+    assert np.array_equal(cache.get('0', lambda: None), arrays[0])
+    cache.get('3', lambda: arrays[3])
+
+    assert sorted(os.listdir(tmp_path)) == ['0.npz', '2.npz', '3.npz']
+
+
+def test_digest():
+    # long arrays are abbreviated by repr, so they must be hashed by contents, also as attributes
+    scale = np.zeros(2000)
+    scale_ = scale.copy()
+    scale_[1000] = 1
+    assert digest(SineNoise(scale=scale)) == digest(SineNoise(scale=scale.copy()))
+    assert digest(SineNoise(scale=scale)) != digest(SineNoise(scale=scale_))
+    assert digest([scale]) != digest([scale_])
+    assert digest({'scale': scale}) != digest({'scale': scale_})
+
+    assert digest(SineNoise()) != digest(RandomNoise())
+    assert digest(SineNoise(profile='reflect')) != digest(SineNoise())
+    assert digest((1, 2)) != digest([1, 2]) != digest(1, 2)
+
+
+def _random_noise_reference(noise, n, rng):
+    # the original per line loop, drawing from rng instead of the global numpy state
+    res = np.array([0.0])
+    for _ in range(n):
+        r = rng.normal(-res.sum() * noise.pull, noise.scale)
+        res = np.insert(res, -1, r)
+
+    return np.convolve(res, np.ones((noise.mean_n,)) / noise.mean_n)[
+        (noise.mean_n - 1) : -1
+    ]
+
+
+@pytest.mark.parametrize(
+    'params', [{}, {'scale': 1.0, 'pull': 0.3, 'mean_n': 7}, {'mean_n': 500}]
+)
+def test_random_noise_matches_loop(params):
+    noise = RandomNoise(**params)
+    batch = noise._generate_batch(4, 300, np.random.RandomState(1))
+
+    rng = np.random.RandomState(1)
+    for line in batch:
+        expected = _random_noise_reference(noise, 300, rng)
+        assert np.allclose(line, expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('noise_cls', [SineNoise, RandomNoise])
+def test_noise_profiles(noise_cls):
+    parallel = noise_cls('parallel').generate(5, 200, seed=2)
+    reflect = noise_cls('reflect').generate(5, 200, seed=2)
+    independent = noise_cls('independent').generate(5, 200, seed=2)
+
+    # parallel edges are the same buffer, broadcast rather than copied
+    assert parallel.shape == (2, 5, 200) and parallel.strides[0] == 0
+    assert np.array_equal(reflect[0], parallel[0])
+    assert np.array_equal(reflect[1], -reflect[0])
+    assert np.array_equal(independent[0], parallel[0])
+    assert not np.allclose(independent[1], independent[0])
+
+    assert np.array_equal(
+        noise_cls('independent').generate(5, 200, seed=2, lines=[3, 1]),
+        independent[:, [3, 1]],
+    )
+
+
+def _sine_noise_reference(noise, n, rng):
+    # the original per line noise, drawing from rng instead of the global numpy state
+    return np.array(
+        [
+            noise.scale
+            * np.sin(np.linspace(0, noise.base_freq * 2 * np.pi, n) * factor + offset)
+            for factor, offset in zip(
+                rng.uniform(*noise.freq_factor, noise.wave_count),
+                rng.uniform(
+                    np.deg2rad(noise.phase_offset_range[0]),
+                    np.deg2rad(noise.phase_offset_range[1]),
+                    noise.wave_count,
+                ),
+            )
+        ]
+    ).prod(axis=0)
+
+
+@pytest.mark.parametrize(
+    'noise_cls, reference',
+    [(SineNoise, _sine_noise_reference), (RandomNoise, _random_noise_reference)],
+)
+def test_noise_seed_matches_global_seed(noise_cls, reference):
+    # seeded noise is what np.random.seed(seed) gave when every top edge and then every bottom edge was drawn
+    # in turn, so seeded output (and the baseline images) are unchanged
+    noise = noise_cls('independent')
+    rng = np.random.RandomState(2)
+    expected = [reference(noise, 200, rng) for _ in range(2 * 5)]
+
+    generated = noise.generate(5, 200, seed=2)
+    assert np.allclose(generated.reshape(10, 200), expected, rtol=0, atol=1e-12)
+
+
+@pytest.mark.parametrize('noise_cls', [SineNoise, RandomNoise])
+def test_noise_seed_deterministic(noise_cls):
+    noise = noise_cls('independent')
+
+    assert np.array_equal(noise.generate(4, 100, seed=7), noise.generate(4, 100, 7))
+    assert not np.allclose(noise.generate(4, 100, seed=7), noise.generate(4, 100, 8))
+    assert not np.allclose(noise.generate(4, 100), noise.generate(4, 100))
+
+
+@pytest.mark.parametrize('profile', ['parallel', 'reflect', 'independent'])
+@pytest.mark.parametrize('noise_cls', [RandomNoise, SineNoise])
+def test_noise_stream(noise_cls, profile):
+    noise = noise_cls(profile)
+    expected = noise.generate(10, 50, 3)
+
+    # bands in order carry on from the previous band, out of order bands start the stream again
+    stream = noise.stream(10, 50, 3)
+    bands = [range(0, 4), range(4, 8), range(8, 10), range(2, 6)]
+    for lines in bands:
+        assert np.array_equal(stream.generate(lines), expected[:, lines])
+
+    # an unseeded stream is still one stream
+    stream = noise.stream(10, 50)
+    assert np.array_equal(
+        np.concatenate(
+            [stream.generate(range(0, 5)), stream.generate(range(5, 10))], 1
+        ),
+        stream.generate(range(10)),
+    )
+
+
+def test_random_noise_float32_memory():
+    # the float64 draws are made a chunk at a time, so float32 noise takes about half the memory of float64
+    noise = RandomNoise()
+    tracemalloc.start()
+    try:
+        n32 = noise.generate(200, 10000, 1, np.float32)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    assert n32.dtype == np.float32
+    assert peak < 2 * n32[0].nbytes
+    assert np.allclose(n32, noise.generate(200, 10000, 1), atol=1e-6)